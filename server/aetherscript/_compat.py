@@ -0,0 +1,7 @@
+"""Compatibility helpers for the Python versions AetherScript supports."""
+
+import sys
+
+# Keyword arguments for @dataclass: slotted instances (no per-instance
+# __dict__) where the interpreter supports it, i.e. Python 3.10+
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
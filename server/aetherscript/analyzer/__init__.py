@@ -4,10 +4,11 @@ This module provides semantic analysis, type checking, and other static analysis
 """
 
 from aetherscript.analyzer.type_checker import TypeChecker
-from aetherscript.analyzer.semantic_analyzer import SemanticAnalyzer
+from aetherscript.analyzer.semantic_analyzer import SemanticAnalyzer, analyze_files
+from aetherscript.analyzer.check_cache import CheckCache
 from aetherscript.analyzer.symbols import Symbol, SymbolTable, FunctionSymbol, VariableSymbol
 
 __all__ = [
-    "TypeChecker", "SemanticAnalyzer", "Symbol", "SymbolTable",
-    "FunctionSymbol", "VariableSymbol"
+    "TypeChecker", "SemanticAnalyzer", "CheckCache", "Symbol", "SymbolTable",
+    "FunctionSymbol", "VariableSymbol", "analyze_files"
 ]
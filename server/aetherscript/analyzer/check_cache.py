@@ -0,0 +1,103 @@
+"""On-disk cache of type check results for AetherScript.
+
+A source file that type checked without errors is recorded under the hash
+of its content together with the symbols it defines at the top level, so
+checking the same content again can restore those symbols instead of
+walking the program. The hash covers the package and cache format versions
+too, and only the most recently used entries are kept.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from aetherscript import __version__
+
+
+class CheckCache:
+    """Stores top-level symbols of error-free sources, keyed by content hash."""
+
+    # Bumped whenever the stored format or the parser's or checker's rules
+    # change, so stale entries are ignored rather than trusted; the package
+    # version is part of every key as well
+    VERSION = 2
+
+    def __init__(self, directory: str = ".aether_cache", max_entries: int = 512):
+        """Initialize a cache stored in ``directory``.
+
+        Storing an entry evicts the least recently used ones beyond
+        ``max_entries``.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def key(self, source: str) -> str:
+        """Get the cache key for a source text."""
+        digest = hashlib.sha256(f"{__version__}\0{self.VERSION}\0".encode("utf-8"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Get the exported symbols stored for ``key``, if any."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return None
+        return data.get("symbols")
+
+    def store(self, key: str, symbols: List[Dict[str, Any]]) -> None:
+        """Store the exported symbols for ``key``.
+
+        The cache is best effort: failing to write it is not an error.
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "symbols": symbols}, f)
+            # Replace atomically so a concurrent reader never sees a partial file
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries beyond ``max_entries``."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
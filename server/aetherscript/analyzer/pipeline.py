@@ -0,0 +1,74 @@
+"""Stack-based AST traversal for AetherScript analyses.
+
+Visitors driven by an AnalysisPipeline do not recurse into child nodes;
+they schedule them on the pipeline's stack instead.
+"""
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from aetherscript.parser.ast import ASTVisitor, Node
+
+
+class _Deferred:
+    """Stack marker for a callback that runs once a subtree has been visited."""
+
+    __slots__ = ("callback", "args")
+
+    def __init__(self, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        self.callback = callback
+        self.args = args
+
+
+class AnalysisPipeline:
+    """Walks an AST for a visitor, in pre-order, with an explicit stack.
+
+    The visitor's visit_* methods schedule child nodes with ``push`` (and
+    scope exits with ``defer``) rather than visiting them. The walk uses an
+    explicit stack rather than recursion, so deep nesting costs no Python
+    frames and cannot hit the recursion limit.
+    """
+
+    def __init__(self, visitor: ASTVisitor) -> None:
+        """Initialize a pipeline that walks trees for ``visitor``."""
+        self._visitor = visitor
+        self._stack: List[Any] = []
+
+    def run(self, node: Node) -> None:
+        """Walk the tree rooted at ``node``, visiting nodes in pre-order."""
+        outer = self._stack
+        stack = self._stack = [node]
+        visitor = self._visitor
+        visitors = visitor._visitors
+
+        try:
+            while stack:
+                item = stack.pop()
+                if type(item) is _Deferred:
+                    item.callback(*item.args)
+                    continue
+
+                visitors[type(item)](visitor, item)
+        finally:
+            self._stack = outer
+
+    def push(self, *nodes: Optional[Node]) -> None:
+        """Schedule child nodes to be visited next, in the given order."""
+        stack = self._stack
+        for node in reversed(nodes):
+            if node is not None:
+                stack.append(node)
+
+    def push_children(self, node: Node) -> None:
+        """Schedule all child nodes of ``node`` to be visited next, in field order."""
+        stack = self._stack
+        node_type = type(node)
+        for name in reversed(node_type._child_list_fields):
+            stack.extend(reversed(getattr(node, name)))
+        for name in reversed(node_type._child_fields):
+            child = getattr(node, name)
+            if child is not None:
+                stack.append(child)
+
+    def defer(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Run ``callback(*args)`` after every node pushed after this call."""
+        self._stack.append(_Deferred(callback, args))
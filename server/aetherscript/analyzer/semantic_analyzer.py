@@ -3,71 +3,152 @@
 This module provides functionality for finding definitions, references, and semantic information.
 """
 
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Union, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Union, Tuple
 
+from aetherscript._compat import DATACLASS_SLOTS
+from aetherscript.parser.parser import Parser
 from aetherscript.parser.ast import (
-    Node, Program, Statement, Expression, Identifier,
-    FunctionDeclaration, VariableDeclaration, Parameter,
-    CallExpression, AssignmentExpression, ASTVisitor
+    Node, Program, Identifier, VariableDeclaration, Parameter,
+    FunctionDeclaration, CallExpression, AssignmentExpression, ASTVisitor
 )
-from aetherscript.analyzer.symbols import SymbolTable, Symbol, VariableSymbol, FunctionSymbol
+from aetherscript.analyzer.symbols import Symbol, VariableSymbol, FunctionSymbol
+from aetherscript.analyzer.pipeline import AnalysisPipeline
 
 
-@dataclass
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
 class Location:
     """Represents a location in the source code."""
 
     line: int
     column: int
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Location):
+            return NotImplemented
+        return self.line == other.line and self.column == other.column
+
     def __str__(self) -> str:
         return f"{self.line}:{self.column}"
 
 
-@dataclass
+# Definitions and references store their position packed into a single int,
+# so storing one costs no extra object and comparing two is one int compare.
+# Columns get 32 bits, enough for any column an LSP position (a 31-bit
+# unsigned character offset) can refer to, even on minified one-line sources
+_COLUMN_BITS = 32
+_COLUMN_MASK = (1 << _COLUMN_BITS) - 1
+
+
+def pack_loc(line: int, column: int) -> int:
+    """Pack a line and column into a single location key."""
+    return (line << _COLUMN_BITS) | column
+
+
+def unpack_loc(key: int) -> Tuple[int, int]:
+    """Unpack a location key into its line and column."""
+    return key >> _COLUMN_BITS, key & _COLUMN_MASK
+
+
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
 class Definition:
     """Represents a definition of a symbol."""
 
     name: str
     kind: str  # "variable", "function", "parameter", etc.
-    location: Location
+    loc_key: int
     type_name: str = ""
-    detail: str = ""
-
-
-@dataclass
+    # Either the detail string itself or the FunctionDeclaration it is
+    # formatted from, so signatures are only built when someone reads them
+    _detail_src: Any = None
+
+    @property
+    def detail(self) -> str:
+        """Get the detail text shown alongside the definition."""
+        src = self._detail_src
+        if src is None:
+            return ""
+        if not isinstance(src, str):
+            src = self._detail_src = format_function_signature(src)
+        return src
+
+    @property
+    def location(self) -> Location:
+        """Get the location of the definition."""
+        return Location(*unpack_loc(self.loc_key))
+
+
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
 class Reference:
     """Represents a reference to a symbol."""
 
     name: str
-    location: Location
+    loc_key: int
     definition: Definition
 
+    @property
+    def location(self) -> Location:
+        """Get the location of the reference."""
+        return Location(*unpack_loc(self.loc_key))
 
-@dataclass
+
+# Most names are defined once, so a name maps straight to its Definition and
+# only becomes a list of definitions once it is defined a second time
+DefinitionEntry = Union[Definition, List[Definition]]
+
+
+@dataclass(**DATACLASS_SLOTS)
 class SemanticInfo:
     """Contains semantic information for a source file."""
 
-    definitions: Dict[str, List[Definition]] = field(default_factory=dict)
+    definitions: Dict[str, DefinitionEntry] = field(default_factory=dict)
     references: List[Reference] = field(default_factory=list)
     errors: List[str] = field(default_factory=list)
 
 
+def format_function_signature(node: FunctionDeclaration) -> str:
+    """Format a function signature for documentation."""
+    # Cached on the node; a re-parse creates new nodes, which drops the cache
+    signature = node._sig_cache
+    if signature is not None:
+        return signature
+
+    params = []
+    for param in node.parameters:
+        params.append(f"{param.name.name}: {param.type_annotation}")
+
+    signature = node._sig_cache = f"function {node.name.name}({', '.join(params)}) -> {node.return_type}"
+    return signature
+
+
 class SemanticAnalyzer(ASTVisitor):
     """Analyzes the semantics of AetherScript code."""
 
-    def __init__(self):
+    def __init__(self) -> None:
         """Initialize the semantic analyzer."""
-        self.symbol_table = SymbolTable()
-        self.definitions: Dict[str, List[Definition]] = {}
+        # Innermost scope last; entering a scope pushes a dict, leaving pops it
+        self._scope_stack: List[Dict[str, Symbol]] = [{}]
+        self.definitions: Dict[str, DefinitionEntry] = {}
         self.references: List[Reference] = []
+        # Number of slots in use; analyze() reserves spare slots up front
+        self._refs_count = 0
+        # References by the (name, location key) of their definition
+        self._refs_by_definition: Dict[Tuple[str, int], List[Reference]] = {}
         self.errors: List[str] = []
         self.current_function: Optional[FunctionSymbol] = None
 
+        # Walks the AST for our visitors (see the ASTVisitor methods below)
+        self._pipeline = AnalysisPipeline(self)
+
         # Initialize with built-in functions and types
         self._init_builtins()
 
+        # Defined names in sorted order, for prefix lookups; kept up to date
+        # by analyze()
+        self.sorted_names: List[str] = sorted(self.definitions)
+
     def _init_builtins(self) -> None:
         """Initialize built-in functions and variables."""
         # Add built-in function symbols
@@ -77,52 +158,78 @@ class SemanticAnalyzer(ASTVisitor):
             parameters=[VariableSymbol(name="value", type_name="Any")],
             is_builtin=True
         )
-        self.symbol_table.define(print_func)
+        self._scope_stack[-1]["print"] = print_func
 
         # Record the definition
-        self._record_definition(
+        print_func.definition = self._record_definition(
             name="print",
             kind="function",
-            location=Location(0, 0),
+            loc_key=pack_loc(0, 0),
             type_name="Void",
             detail="Built-in function: print(value: Any) -> Void"
         )
 
-    def analyze(self, program: Program) -> SemanticInfo:
-        """Analyze the program and collect semantic information."""
-        program.accept(self)
+    def analyze(self, program: Program, size_hint: int = 0) -> SemanticInfo:
+        """Analyze the program and collect semantic information.
+
+        ``size_hint`` is an estimate of the number of identifier references
+        in the program, used to reserve space for them up front.
+        """
+        # Reserved slots hold None until filled; the unused ones are trimmed
+        references: List[Any] = self.references
+        references.extend([None] * size_hint)
+        try:
+            self._pipeline.run(program)
+        finally:
+            # Drop the reserved slots that were not used
+            del references[self._refs_count:]
+            self.sorted_names = sorted(self.definitions)
         return SemanticInfo(
             definitions=self.definitions,
             references=self.references,
             errors=self.errors
         )
 
-    def find_definition(self, name: str, location: Location) -> Optional[Definition]:
-        """Find the definition of a symbol at a given location."""
-        # Find the definition that best matches the location
-        definitions = self.definitions.get(name, [])
-        if not definitions:
-            return None
-
+    def find_definition(self, name: str) -> Optional[Definition]:
+        """Find the definition of a symbol."""
         # For now, just return the first definition
         # In a real implementation, we would check scopes
-        return definitions[0]
+        entry = self.definitions.get(name)
+        if entry is None or isinstance(entry, Definition):
+            return entry
+        return entry[0]
+
+    def names_with_prefix(self, prefix: str) -> List[str]:
+        """Get the defined names that start with ``prefix``, in sorted order."""
+        start, end = self.prefix_range(prefix)
+        return self.sorted_names[start:end]
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Get the (start, end) range of ``sorted_names`` that start with ``prefix``."""
+        names = self.sorted_names
+        start = end = bisect_left(names, prefix)
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return start, end
+
+    def iter_definitions(self) -> Iterator[Tuple[str, Definition]]:
+        """Iterate over every recorded (name, definition) pair."""
+        for name, entry in self.definitions.items():
+            if isinstance(entry, Definition):
+                yield name, entry
+            else:
+                for definition in entry:
+                    yield name, definition
 
     def find_all_references(self, name: str, def_location: Location) -> List[Reference]:
         """Find all references to a symbol."""
-        # Filter references by name and definition location
-        return [
-            ref for ref in self.references
-            if ref.name == name and (
-                ref.definition.location.line == def_location.line and
-                ref.definition.location.column == def_location.column
-            )
-        ]
+        # References are grouped by definition as they are recorded
+        return list(self._refs_by_definition.get((name, pack_loc(def_location.line, def_location.column)), ()))
 
     def find_hover_info(self, name: str, location: Location) -> Optional[str]:
         """Get hover information for a symbol at a given location."""
         # Find the definition
-        definition = self.find_definition(name, location)
+        definition = self.find_definition(name)
         if definition is None:
             return None
 
@@ -132,58 +239,105 @@ class SemanticAnalyzer(ASTVisitor):
         else:
             return f"{definition.kind} {definition.name}: {definition.type_name}"
 
-    def _record_definition(self, name: str, kind: str, location: Location, type_name: str = "", detail: str = "") -> Definition:
-        """Record a definition."""
+    def _record_definition(self, name: str, kind: str, loc_key: int, type_name: str = "", detail: Any = None) -> Definition:
+        """Record a definition.
+
+        ``detail`` may be a string or a FunctionDeclaration whose signature is
+        formatted the first time the definition's ``detail`` is read.
+        """
         definition = Definition(
             name=name,
             kind=kind,
-            location=location,
+            loc_key=loc_key,
             type_name=type_name,
-            detail=detail
+            _detail_src=detail
         )
 
-        if name not in self.definitions:
-            self.definitions[name] = []
+        entry = self.definitions.get(name)
+        if entry is None:
+            self.definitions[name] = definition
+        elif isinstance(entry, Definition):
+            self.definitions[name] = [entry, definition]
+        else:
+            entry.append(definition)
 
-        self.definitions[name].append(definition)
         return definition
 
-    def _record_reference(self, name: str, location: Location, definition: Definition) -> Reference:
+    def _record_reference(self, name: str, line: int, column: int, definition: Definition) -> Reference:
         """Record a reference."""
         reference = Reference(
             name=name,
-            location=location,
+            loc_key=pack_loc(line, column),
             definition=definition
         )
 
-        self.references.append(reference)
+        # Grow the reserved slots geometrically instead of appending
+        i = self._refs_count
+        references: List[Any] = self.references
+        if i == len(references):
+            references.extend([None] * (i or 16))
+        references[i] = reference
+        self._refs_count = i + 1
+
+        self._refs_by_definition.setdefault((name, definition.loc_key), []).append(reference)
         return reference
 
+    def _reference_target(self, definition: Definition) -> Definition:
+        """Get the definition that references to a new symbol resolve to.
+
+        References resolve to the first definition of a name, matching
+        find_definition(), so a redefinition keeps pointing at the first.
+        """
+        entry = self.definitions[definition.name]
+        return entry if isinstance(entry, Definition) else entry[0]
+
+    def _resolve(self, name: str) -> Optional[Symbol]:
+        """Look up a symbol by name, from the innermost scope outwards."""
+        for scope in reversed(self._scope_stack):
+            symbol = scope.get(name)
+            if symbol is not None:
+                return symbol
+        return None
+
+    def _restore_scope(self, function: Optional[FunctionSymbol]) -> None:
+        """Leave the innermost scope and restore the enclosing function."""
+        self._scope_stack.pop()
+        self.current_function = function
+
     # ASTVisitor methods
+    #
+    # Visitors do not recurse: they schedule child nodes on the pipeline with
+    # push(), and scope exits with defer() before pushing the scope's children.
+
+    def _generic_visit(self, node: Node) -> Any:
+        """Visit every child of a node that needs no handling of its own."""
+        self._pipeline.push_children(node)
+        return None
 
     def visit_program(self, node: Program) -> Any:
         """Visit a program node."""
-        for statement in node.statements:
-            statement.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_identifier(self, node: Identifier) -> Any:
         """Visit an identifier node."""
+        name = node.name
+
         # Look up the symbol
-        symbol = self.symbol_table.resolve(node.name)
+        symbol = self._resolve(name)
 
         if symbol is None:
-            self.errors.append(f"Undefined identifier '{node.name}' at {node.line}:{node.column}")
+            self.errors.append(f"Undefined identifier '{name}' at {node.line}:{node.column}")
             return None
 
-        # Find the definition
-        definition = self.find_definition(node.name, Location(node.line, node.column))
+        # The symbol points straight at its definition
+        definition = symbol.definition
 
         if definition is not None:
             # Record a reference
             self._record_reference(
-                name=node.name,
-                location=Location(node.line, node.column),
+                name=name,
+                line=node.line,
+                column=node.column,
                 definition=definition
             )
 
@@ -195,47 +349,32 @@ class SemanticAnalyzer(ASTVisitor):
         func_def = self._record_definition(
             name=node.name.name,
             kind="function",
-            location=Location(node.line, node.column),
+            loc_key=pack_loc(node.line, node.column),
             type_name=node.return_type,
-            detail=self._format_function_signature(node)
+            detail=node
         )
 
         # Create a function symbol
         func_symbol = FunctionSymbol(
             name=node.name.name,
             type_name=node.return_type,
-            parameters=[]
+            parameters=[],
+            definition=self._reference_target(func_def)
         )
 
         # Add the function to the current scope
-        if self.symbol_table.contains_local(node.name.name):
+        if self._scope_stack[-1].setdefault(node.name.name, func_symbol) is not func_symbol:
             self.errors.append(f"Function '{node.name.name}' is already defined at {node.line}:{node.column}")
-        else:
-            self.symbol_table.define(func_symbol)
 
-        # Create a new scope for the function body
-        function_scope = self.symbol_table.create_child_scope(node.name.name)
-        previous_scope = self.symbol_table
-        self.symbol_table = function_scope
+        # Restore the previous scope and function once the body is done
+        self._pipeline.defer(self._restore_scope, self.current_function)
 
-        # Save previous function and set current function
-        previous_function = self.current_function
+        # Create a new scope for the function body
+        self._scope_stack.append({})
         self.current_function = func_symbol
 
-        # Process parameters
-        for param in node.parameters:
-            param.accept(self)
-            param_symbol = self.symbol_table.resolve_local(param.name.name)
-            if param_symbol:
-                func_symbol.parameters.append(param_symbol)
-
-        # Process the function body
-        for statement in node.body:
-            statement.accept(self)
-
-        # Restore previous scope and function
-        self.symbol_table = previous_scope
-        self.current_function = previous_function
+        # Process the parameters, then the function body
+        self._pipeline.push(*node.parameters, *node.body)
 
         return None
 
@@ -245,18 +384,21 @@ class SemanticAnalyzer(ASTVisitor):
         param_def = self._record_definition(
             name=node.name.name,
             kind="parameter",
-            location=Location(node.name.line, node.name.column),
+            loc_key=pack_loc(node.name.line, node.name.column),
             type_name=node.type_annotation
         )
 
         # Create a parameter symbol
         param_symbol = VariableSymbol(
             name=node.name.name,
-            type_name=node.type_annotation
+            type_name=node.type_annotation,
+            definition=self._reference_target(param_def)
         )
 
-        # Add the parameter to the current scope
-        self.symbol_table.define(param_symbol)
+        # Add the parameter to the current scope and its function
+        self._scope_stack[-1][node.name.name] = param_symbol
+        if self.current_function is not None:
+            self.current_function.parameters.append(param_symbol)
 
         return None
 
@@ -269,48 +411,35 @@ class SemanticAnalyzer(ASTVisitor):
         var_def = self._record_definition(
             name=node.name.name,
             kind="variable",
-            location=Location(node.line, node.column),
+            loc_key=pack_loc(node.line, node.column),
             type_name=var_type
         )
 
         # Create a variable symbol
         var_symbol = VariableSymbol(
             name=node.name.name,
-            type_name=var_type
+            type_name=var_type,
+            definition=self._reference_target(var_def)
         )
 
         # Add the variable to the current scope
-        if self.symbol_table.contains_local(node.name.name):
+        if self._scope_stack[-1].setdefault(node.name.name, var_symbol) is not var_symbol:
             self.errors.append(f"Variable '{node.name.name}' is already defined at {node.line}:{node.column}")
-        else:
-            self.symbol_table.define(var_symbol)
 
         # Process the initializer, if any
-        if node.initializer is not None:
-            node.initializer.accept(self)
+        self._pipeline.push(node.initializer)
 
         return None
 
     def visit_call_expression(self, node: CallExpression) -> Any:
         """Visit a call expression node."""
-        # Process the callee
-        node.callee.accept(self)
-
-        # Process the arguments
-        for arg in node.arguments:
-            arg.accept(self)
-
-        return None
+        # Process the callee, then the arguments
+        return self._generic_visit(node)
 
     def visit_assignment_expression(self, node: AssignmentExpression) -> Any:
         """Visit an assignment expression node."""
-        # Process the target
-        node.target.accept(self)
-
-        # Process the value
-        node.value.accept(self)
-
-        return None
+        # Process the target, then the value
+        return self._generic_visit(node)
 
     # Default implementation for other node types
 
@@ -327,88 +456,83 @@ class SemanticAnalyzer(ASTVisitor):
         return None
 
     def visit_binary_expression(self, node: Any) -> Any:
-        node.left.accept(self)
-        node.right.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_unary_expression(self, node: Any) -> Any:
-        node.right.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_return_statement(self, node: Any) -> Any:
-        if node.value is not None:
-            node.value.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_block_statement(self, node: Any) -> Any:
+        # Restore the previous scope once the block is done
+        self._pipeline.defer(self._restore_scope, self.current_function)
+
         # Create a new scope for the block
-        block_scope = self.symbol_table.create_child_scope()
-        previous_scope = self.symbol_table
-        self.symbol_table = block_scope
+        self._scope_stack.append({})
 
         # Process the statements in the block
-        for statement in node.statements:
-            statement.accept(self)
-
-        # Restore the previous scope
-        self.symbol_table = previous_scope
-        return None
+        return self._generic_visit(node)
 
     def visit_if_statement(self, node: Any) -> Any:
-        node.condition.accept(self)
-        node.then_branch.accept(self)
-        if node.else_branch is not None:
-            node.else_branch.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_while_statement(self, node: Any) -> Any:
-        node.condition.accept(self)
-        node.body.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_for_statement(self, node: Any) -> Any:
-        # Create a new scope for the for loop
-        for_scope = self.symbol_table.create_child_scope()
-        previous_scope = self.symbol_table
-        self.symbol_table = for_scope
-
-        # Process the initializer, condition, and increment
-        if node.initializer is not None:
-            node.initializer.accept(self)
-
-        if node.condition is not None:
-            node.condition.accept(self)
+        # Restore the previous scope once the loop is done
+        self._pipeline.defer(self._restore_scope, self.current_function)
 
-        if node.increment is not None:
-            node.increment.accept(self)
+        # Create a new scope for the for loop
+        self._scope_stack.append({})
 
-        # Process the body
-        node.body.accept(self)
-
-        # Restore the previous scope
-        self.symbol_table = previous_scope
-        return None
+        # Process the initializer, condition, increment and body
+        return self._generic_visit(node)
 
     def visit_expression_statement(self, node: Any) -> Any:
-        node.expression.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_array_literal(self, node: Any) -> Any:
-        for element in node.elements:
-            element.accept(self)
-        return None
+        return self._generic_visit(node)
 
     def visit_index_expression(self, node: Any) -> Any:
-        node.array.accept(self)
-        node.index.accept(self)
-        return None
+        return self._generic_visit(node)
 
     # Utility methods
 
     def _format_function_signature(self, node: FunctionDeclaration) -> str:
         """Format a function signature for documentation."""
-        params = []
-        for param in node.parameters:
-            params.append(f"{param.name.name}: {param.type_annotation}")
+        return format_function_signature(node)
+
+
+def _analyze_one(path: str) -> SemanticInfo:
+    """Parse and analyze a single file (runs in a worker process)."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    info = SemanticAnalyzer().analyze(Parser(text).parse(), size_hint=len(text) // 16)
+
+    # Format lazy details here, replacing the FunctionDeclaration each one
+    # keeps with its text, so the AST is not pickled back with them
+    for entry in info.definitions.values():
+        for definition in entry if isinstance(entry, list) else (entry,):
+            definition._detail_src = definition.detail
+
+    return info
+
+
+def analyze_files(paths: List[str], n_jobs: int = -1) -> Dict[str, SemanticInfo]:
+    """Analyze many files, one file per task across worker processes.
+
+    ``n_jobs`` is the number of worker processes; -1 uses every CPU and 1
+    analyzes the files in this process.
+    """
+    if n_jobs < 1 and n_jobs != -1:
+        raise ValueError(f"n_jobs must be -1 or at least 1, got {n_jobs}")
+
+    if n_jobs == 1 or len(paths) < 2:
+        return {path: _analyze_one(path) for path in paths}
 
-        return f"function {node.name.name}({', '.join(params)}) -> {node.return_type}"
+    with ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs) as executor:
+        return dict(zip(paths, executor.map(_analyze_one, paths)))
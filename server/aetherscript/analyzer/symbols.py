@@ -1,49 +1,111 @@
 """Symbol handling for AetherScript."""
 
-from abc import ABC
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Set
+from typing import TYPE_CHECKING, ClassVar, Dict, List, Optional, Any, Set, Tuple
 
+from aetherscript._compat import DATACLASS_SLOTS
+from aetherscript.analyzer.type_codes import type_code
 
-@dataclass
-class Symbol(ABC):
+if TYPE_CHECKING:
+    from aetherscript.analyzer.semantic_analyzer import Definition
+
+
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
+class Symbol:
     """Base class for all symbols."""
 
     name: str
     type_name: str
+    # Definition that references to this symbol resolve to, if recorded
+    definition: Optional['Definition'] = None
+    # Code of type_name (see type_codes), worked out once at construction
+    type_code: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.type_code = type_code(self.type_name)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.name}: {self.type_name})"
 
 
-@dataclass
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
 class VariableSymbol(Symbol):
     """Symbol representing a variable."""
 
     is_mutable: bool = True
 
 
-@dataclass
+@dataclass(eq=False, repr=False, **DATACLASS_SLOTS)
 class FunctionSymbol(Symbol):
     """Symbol representing a function."""
 
     parameters: List[Symbol] = field(default_factory=list)
     is_builtin: bool = False
 
+    @property
+    def param_types(self) -> Tuple[int, ...]:
+        """Type codes of the parameters, for argument checks.
+
+        Worked out on each access, as parameters may be added after the
+        symbol is created (the semantic analyzer does so).
+        """
+        return tuple(param.type_code for param in self.parameters)
+
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SymbolTable:
     """Symbol table for tracking declarations and scopes."""
 
     symbols: Dict[str, Symbol] = field(default_factory=dict)
     parent: Optional['SymbolTable'] = None
     name: str = "global"
+    # Symbols found in enclosing scopes by resolve(), so a name is only looked
+    # up along the parent chain once. This assumes enclosing scopes gain no
+    # names while this scope is in use, which holds for a scope being checked.
+    _resolve_cache: Dict[str, Symbol] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # Released scopes waiting to be reused by acquire(), up to _POOL_LIMIT
+    _pool: ClassVar[List['SymbolTable']] = []
+    _POOL_LIMIT: ClassVar[int] = 256
+
+    @classmethod
+    def acquire(cls, parent: Optional['SymbolTable'] = None, name: str = "") -> 'SymbolTable':
+        """Get an empty scope, reusing a released one if there is any.
+
+        Scopes obtained this way should be given back with release() once
+        they are no longer needed.
+        """
+        if not name and parent is not None:
+            name = f"{parent.name}.child{len(parent.symbols)}"
+        try:
+            table = cls._pool.pop()
+        except IndexError:
+            return cls(parent=parent, name=name or "global")
+        table.parent = parent
+        table.name = name or "global"
+        return table
+
+    def release(self) -> None:
+        """Empty this scope and return it to the pool used by acquire()."""
+        self.symbols.clear()
+        self._resolve_cache.clear()
+        self.parent = None
+        if len(SymbolTable._pool) < SymbolTable._POOL_LIMIT:
+            SymbolTable._pool.append(self)
 
     def define(self, symbol: Symbol) -> Symbol:
         """Define a new symbol in the current scope."""
-        self.symbols[symbol.name] = symbol
+        self.symbols[sys.intern(symbol.name)] = symbol
         return symbol
 
+    def try_define(self, symbol: Symbol) -> bool:
+        """Define a new symbol unless its name is already defined in the current scope.
+
+        Returns False, leaving the existing symbol in place, if it was.
+        """
+        return self.symbols.setdefault(sys.intern(symbol.name), symbol) is symbol
+
     def resolve(self, name: str) -> Optional[Symbol]:
         """Look up a symbol by name, checking parent scopes if necessary."""
         symbol = self.symbols.get(name)
@@ -52,7 +114,12 @@ class SymbolTable:
             return symbol
 
         if self.parent is not None:
-            return self.parent.resolve(name)
+            symbol = self._resolve_cache.get(name)
+            if symbol is None:
+                symbol = self.parent.resolve(name)
+                if symbol is not None:
+                    self._resolve_cache[name] = symbol
+            return symbol
 
         return None
 
@@ -68,6 +135,48 @@ class SymbolTable:
         """Check if the symbol exists in the current scope."""
         return name in self.symbols
 
+    def export_public(self) -> List[Dict[str, Any]]:
+        """Export the non-built-in symbols of this scope as JSON-ready dicts."""
+        entries: List[Dict[str, Any]] = []
+        for symbol in self.symbols.values():
+            if isinstance(symbol, FunctionSymbol):
+                if symbol.is_builtin:
+                    continue
+                entries.append({
+                    "kind": "function",
+                    "name": symbol.name,
+                    "type": symbol.type_name,
+                    "parameters": [[param.name, param.type_name] for param in symbol.parameters],
+                })
+            elif isinstance(symbol, VariableSymbol):
+                entries.append({
+                    "kind": "variable",
+                    "name": symbol.name,
+                    "type": symbol.type_name,
+                    "mutable": symbol.is_mutable,
+                })
+        return entries
+
+    def import_public(self, entries: List[Dict[str, Any]]) -> None:
+        """Define the symbols previously exported with export_public."""
+        for entry in entries:
+            if entry["kind"] == "function":
+                symbol: Symbol = FunctionSymbol(
+                    name=entry["name"],
+                    type_name=sys.intern(entry["type"]),
+                    parameters=[
+                        VariableSymbol(name=name, type_name=sys.intern(type_name))
+                        for name, type_name in entry["parameters"]
+                    ]
+                )
+            else:
+                symbol = VariableSymbol(
+                    name=entry["name"],
+                    type_name=sys.intern(entry["type"]),
+                    is_mutable=entry["mutable"]
+                )
+            self.define(symbol)
+
     def create_child_scope(self, name: str = "") -> 'SymbolTable':
         """Create a new child scope."""
         scope_name = name if name else f"{self.name}.child{len(self.symbols)}"
@@ -1,10 +1,10 @@
 """Type checker for AetherScript."""
 
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Set, Tuple
+import sys
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 
 from aetherscript.parser.ast import (
-    Program, Node, Statement, Expression, Identifier,
+    Program, Node, Expression, Identifier,
     IntegerLiteral, FloatLiteral, StringLiteral, BooleanLiteral,
     BinaryExpression, UnaryExpression, VariableDeclaration,
     Parameter, FunctionDeclaration, ReturnStatement,
@@ -12,11 +12,125 @@ from aetherscript.parser.ast import (
     ExpressionStatement, CallExpression, AssignmentExpression,
     ArrayLiteral, IndexExpression, ASTVisitor
 )
+from aetherscript.parser.parser import Parser
+from aetherscript.analyzer.check_cache import CheckCache
 from aetherscript.analyzer.symbols import SymbolTable, Symbol, VariableSymbol, FunctionSymbol
+from aetherscript.analyzer.type_codes import LocalTypeCodes, TypeCode, type_code, type_name
 
 
-@dataclass
-class TypeError:
+# Built-in type names, interned so comparisons against them usually succeed
+# on identity before falling back to comparing characters
+T_INT, T_FLOAT, T_STRING, T_BOOL, T_VOID, T_UNKNOWN, T_ANY = map(
+    sys.intern, ("Int", "Float", "String", "Boolean", "Void", "Unknown", "Any")
+)
+
+BUILTIN_TYPES = frozenset(map(sys.intern, (
+    "Void", "Int", "Float", "String", "Boolean",
+    "Array", "Map", "Element", "Energy", "Spirit", "Matter"
+)))
+
+# Visitors return type codes; plain ints rather than TypeCode members keep
+# comparisons on CPython's int fast path
+TY_VOID, TY_INT, TY_FLOAT, TY_STRING, TY_BOOL, TY_UNKNOWN, TY_ANY = (
+    int(code) for code in (
+        TypeCode.VOID, TypeCode.INT, TypeCode.FLOAT, TypeCode.STRING,
+        TypeCode.BOOLEAN, TypeCode.UNKNOWN, TypeCode.ANY
+    )
+)
+TY_EMPTY_ARRAY = type_code("Array<Any>")
+
+# Type of each literal node class, which does not depend on its value
+_LITERAL_TYPES: Dict[type, int] = {
+    IntegerLiteral: TY_INT,
+    FloatLiteral: TY_FLOAT,
+    StringLiteral: TY_STRING,
+    BooleanLiteral: TY_BOOL,
+}
+
+# Bit set of the numeric type codes, tested with (_NUMERIC_MASK >> code) & 1
+_NUMERIC_MASK = (1 << TY_INT) | (1 << TY_FLOAT)
+_ARITHMETIC_OPERATORS = frozenset(("+", "-", "*", "/"))
+_COMPARISON_OPERATORS = frozenset(("==", "!=", "<", ">", "<=", ">="))
+
+# Result type of each arithmetic operator on numeric operand types: Int when
+# both operands are Int, Float otherwise
+_ARITHMETIC_RESULTS: Dict[Tuple[str, int, int], int] = {
+    (operator, left, right): TY_INT if left == right == TY_INT else TY_FLOAT
+    for operator in _ARITHMETIC_OPERATORS
+    for left in (TY_INT, TY_FLOAT)
+    for right in (TY_INT, TY_FLOAT)
+}
+
+
+# Built-in symbols are never modified, so they are created once and shared by
+# every checker's global scope
+_BUILTIN_SYMBOLS: Tuple[Symbol, ...] = (
+    FunctionSymbol(
+        name="print",
+        type_name=T_VOID,
+        parameters=[VariableSymbol(name="value", type_name=T_ANY)],
+        is_builtin=True
+    ),
+)
+
+# Errors are recorded as (code, line, column, args) tuples and only formatted
+# into TypeError objects when someone asks for them (see materialize)
+_ERR_UNDEFINED_IDENTIFIER = 1
+_ERR_BINARY_OPERANDS = 2
+_ERR_UNARY_OPERAND = 3
+_ERR_UNKNOWN_TYPE = 4
+_ERR_ASSIGN_TYPE = 5
+_ERR_VARIABLE_REDEFINED = 6
+_ERR_FUNCTION_REDEFINED = 7
+_ERR_RETURN_OUTSIDE_FUNCTION = 8
+_ERR_MISSING_RETURN_VALUE = 9
+_ERR_RETURN_TYPE = 10
+_ERR_IF_CONDITION = 11
+_ERR_WHILE_CONDITION = 12
+_ERR_FOR_CONDITION = 13
+_ERR_UNDEFINED_FUNCTION = 14
+_ERR_NOT_A_FUNCTION = 15
+_ERR_ARGUMENT_COUNT = 16
+_ERR_ARGUMENT_TYPE = 17
+_ERR_NOT_CALLABLE = 18
+_ERR_UNDEFINED_VARIABLE = 19
+_ERR_IMMUTABLE_ASSIGNMENT = 20
+_ERR_INVALID_ASSIGNMENT_TARGET = 21
+_ERR_ARRAY_ELEMENT_TYPE = 22
+_ERR_INDEX_NON_ARRAY = 23
+_ERR_INDEX_TYPE = 24
+
+_ERROR_FORMATS: Dict[int, str] = {
+    _ERR_UNDEFINED_IDENTIFIER: "Undefined identifier '{}'",
+    _ERR_BINARY_OPERANDS: "Cannot apply operator '{}' to types '{}' and '{}'",
+    _ERR_UNARY_OPERAND: "Cannot apply unary operator '{}' to type '{}'",
+    _ERR_UNKNOWN_TYPE: "Unknown type '{}'",
+    _ERR_ASSIGN_TYPE: "Cannot assign a value of type '{}' to a variable of type '{}'",
+    _ERR_VARIABLE_REDEFINED: "Variable '{}' is already defined in this scope",
+    _ERR_FUNCTION_REDEFINED: "Function '{}' is already defined in this scope",
+    _ERR_RETURN_OUTSIDE_FUNCTION: "Return statement outside of function",
+    _ERR_MISSING_RETURN_VALUE: "Function '{}' must return a value of type '{}'",
+    _ERR_RETURN_TYPE: "Cannot return a value of type '{}' from a function with return type '{}'",
+    _ERR_IF_CONDITION: "If condition must be a Boolean, got '{}'",
+    _ERR_WHILE_CONDITION: "While condition must be a Boolean, got '{}'",
+    _ERR_FOR_CONDITION: "For condition must be a Boolean, got '{}'",
+    _ERR_UNDEFINED_FUNCTION: "Undefined function '{}'",
+    _ERR_NOT_A_FUNCTION: "Cannot call non-function '{}'",
+    _ERR_ARGUMENT_COUNT: "Function '{}' expects {} arguments, but got {}",
+    _ERR_ARGUMENT_TYPE: "Argument {} to function '{}' must be of type '{}', got '{}'",
+    _ERR_NOT_CALLABLE: "Expression of type '{}' is not callable",
+    _ERR_UNDEFINED_VARIABLE: "Undefined variable '{}'",
+    _ERR_IMMUTABLE_ASSIGNMENT: "Cannot assign to immutable variable '{}'",
+    _ERR_INVALID_ASSIGNMENT_TARGET: "Invalid assignment target",
+    _ERR_ARRAY_ELEMENT_TYPE: "Array elements must all have the same type. Expected '{}', got '{}'",
+    _ERR_INDEX_NON_ARRAY: "Cannot index into non-array type '{}'",
+    _ERR_INDEX_TYPE: "Array index must be an Int, got '{}'",
+}
+
+ErrorRecord = Tuple[int, int, int, Tuple[Any, ...]]
+
+
+class TypeError(NamedTuple):
     """Represents a type error."""
 
     message: str
@@ -30,17 +144,28 @@ class TypeError:
 class TypeChecker(ASTVisitor):
     """Type checker for AetherScript."""
 
-    def __init__(self):
-        """Initialize the type checker."""
+    def __init__(self, cache: Optional[CheckCache] = None, strict_visit_on_error: bool = False):
+        """Initialize the type checker.
+
+        With a ``cache``, sources that checked cleanly before are not walked
+        again; see check(). Once a statement or expression has an error that
+        makes the rest of it meaningless (an undefined assignment target, a
+        call to something that is not a function, ...), its remaining
+        subexpressions are skipped unless ``strict_visit_on_error`` is set.
+        """
+        self.cache = cache
+        self.strict_visit_on_error = strict_visit_on_error
         self.symbol_table = SymbolTable()
-        self.errors: List[TypeError] = []
+        self.errors: List[ErrorRecord] = []
         self.current_function: Optional[FunctionSymbol] = None
 
+        # Codes of unknown type names seen in the current check
+        self._codes = LocalTypeCodes()
+
         # Define built-in types
-        self.types = {
-            "Void", "Int", "Float", "String", "Boolean",
-            "Array", "Map", "Element", "Energy", "Spirit", "Matter"
-        }
+        self.types: FrozenSet[str] = BUILTIN_TYPES
+
+        self._checked = False
 
         # Initialize with built-in functions and variables
         self._init_builtins()
@@ -48,152 +173,205 @@ class TypeChecker(ASTVisitor):
     def _init_builtins(self) -> None:
         """Initialize built-in functions and variables."""
         # Add built-in functions like print, etc.
-        self.symbol_table.define(
-            FunctionSymbol(
-                name="print",
-                type_name="Void",
-                parameters=[VariableSymbol(name="value", type_name="Any")],
-                is_builtin=True
-            )
-        )
-
-    def check(self, program: Program) -> List[TypeError]:
-        """Type check the program."""
-        program.accept(self)
-        return self.errors
+        for symbol in _BUILTIN_SYMBOLS:
+            self.symbol_table.define(symbol)
+
+    def check(
+        self, program: Program, source: Optional[str] = None, update_cache: bool = True
+    ) -> List[TypeError]:
+        """Type check the program.
+
+        If the checker has a cache and ``source`` (the text ``program`` was parsed
+        from) is given, a source that checked without errors before only has
+        its top-level symbols restored, and unless ``update_cache`` is false
+        a source that checks without errors now is recorded for next time.
+        """
+        if self._checked:
+            # Start again from the built-ins, in the same global scope object
+            self.errors = []
+            self._codes = LocalTypeCodes()
+            self.symbol_table.symbols.clear()
+            self._init_builtins()
+        self._checked = True
+
+        cache = self.cache
+        cache_key = None
+        if cache is not None and source is not None:
+            cache_key = cache.key(source)
+            symbols = cache.load(cache_key)
+            if symbols is not None:
+                self.symbol_table.import_public(symbols)
+                return []
+
+        self._visit(program)
+
+        if update_cache and source is not None and cache_key is not None:
+            self.store_in_cache(source, cache_key)
+        return self.materialize()
+
+    def store_in_cache(self, source: str, cache_key: Optional[str] = None) -> None:
+        """Record the last check of ``source`` in the cache, if it had no errors."""
+        if self.cache is not None and not self.errors:
+            if cache_key is None:
+                cache_key = self.cache.key(source)
+            self.cache.store(cache_key, self.symbol_table.export_public())
+
+    def materialize(self) -> List[TypeError]:
+        """Format the recorded errors into TypeError objects."""
+        return [
+            TypeError(message=_ERROR_FORMATS[code].format(*args), line=line, column=column)
+            for code, line, column, args in self.errors
+        ]
+
+    def _visit(self, node: Node) -> Any:
+        """Visit a node through the class's dispatch table (see ASTVisitor)."""
+        return self._visitors[type(node)](self, node)
+
+    def _visit_skipped(self, nodes: List[Any]) -> None:
+        """Visit subexpressions left unchecked after an error, in strict mode only."""
+        if self.strict_visit_on_error:
+            for node in nodes:
+                self._visit(node)
 
     def visit_program(self, node: Program) -> Any:
         """Visit a program node."""
+        visit = self._visit
         for statement in node.statements:
-            statement.accept(self)
+            visit(statement)
         return "Program"
 
-    def visit_identifier(self, node: Identifier) -> str:
+    def _symbol_type(self, symbol: Symbol) -> int:
+        """Get the type code of a symbol, telling unknown type names apart."""
+        code = symbol.type_code
+        return code if code != TY_UNKNOWN else self._codes.code(symbol.type_name)
+
+    def visit_identifier(self, node: Identifier) -> int:
         """Visit an identifier node."""
         symbol = self.symbol_table.resolve(node.name)
 
         if symbol is None:
             self.errors.append(
-                TypeError(
-                    message=f"Undefined identifier '{node.name}'",
-                    line=node.line,
-                    column=node.column
-                )
+                (_ERR_UNDEFINED_IDENTIFIER, node.line, node.column, (node.name,))
             )
-            return "Unknown"
+            return TY_UNKNOWN
 
-        return symbol.type_name
+        return self._symbol_type(symbol)
 
-    def visit_integer_literal(self, node: IntegerLiteral) -> str:
+    def visit_integer_literal(self, node: IntegerLiteral) -> int:
         """Visit an integer literal node."""
-        return "Int"
+        return TY_INT
 
-    def visit_float_literal(self, node: FloatLiteral) -> str:
+    def visit_float_literal(self, node: FloatLiteral) -> int:
         """Visit a float literal node."""
-        return "Float"
+        return TY_FLOAT
 
-    def visit_string_literal(self, node: StringLiteral) -> str:
+    def visit_string_literal(self, node: StringLiteral) -> int:
         """Visit a string literal node."""
-        return "String"
+        return TY_STRING
 
-    def visit_boolean_literal(self, node: BooleanLiteral) -> str:
+    def visit_boolean_literal(self, node: BooleanLiteral) -> int:
         """Visit a boolean literal node."""
-        return "Boolean"
-
-    def visit_binary_expression(self, node: BinaryExpression) -> str:
-        """Visit a binary expression node."""
-        left_type = node.left.accept(self)
-        right_type = node.right.accept(self)
-
-        # Example type checking for binary operators
-        if node.operator in ["+", "-", "*", "/"]:
-            if left_type == "Int" and right_type == "Int":
-                return "Int"
-            elif left_type in ["Int", "Float"] and right_type in ["Int", "Float"]:
-                return "Float"
-            elif node.operator == "+" and (left_type == "String" or right_type == "String"):
-                return "String"
-
-        elif node.operator in ["==", "!=", "<", ">", "<=", ">="]:
+        return TY_BOOL
+
+    def visit_binary_expression(self, node: BinaryExpression) -> int:
+        """Visit a binary expression node.
+
+        A chain of left associative operators nests on the left, so the chain
+        is walked down in a loop and checked from the innermost operator
+        outwards, rather than with a recursive visit per operator.
+        """
+        # The chain's binary expressions, outermost first, down to the first
+        # left operand that is not one
+        chain = [node]
+        left: Expression = node.left
+        while type(left) is BinaryExpression:
+            chain.append(left)
+            left = left.left
+
+        left_type = self._visit(left)
+        for binary in reversed(chain):
+            left_type = self._binary_type(binary, left_type, self._visit(binary.right))
+        return left_type
+
+    def _binary_type(self, node: BinaryExpression, left_type: int, right_type: int) -> int:
+        """Get the type of a binary expression from its operand types."""
+        # Arithmetic on numbers is a single table lookup; testing both operand
+        # bits first spares other operand types from building the key
+        operator = node.operator
+        if (_NUMERIC_MASK >> left_type) & (_NUMERIC_MASK >> right_type) & 1:
+            result = _ARITHMETIC_RESULTS.get((operator, left_type, right_type))
+            if result is not None:
+                return result
+
+        if operator in _COMPARISON_OPERATORS:
             # Comparison operators
-            return "Boolean"
+            return TY_BOOL
+        elif operator == "+" and (left_type == TY_STRING or right_type == TY_STRING):
+            # String concatenation accepts any other operand type
+            return TY_STRING
 
         # Error case - incompatible types
         self.errors.append(
-            TypeError(
-                message=f"Cannot apply operator '{node.operator}' to types '{left_type}' and '{right_type}'",
-                line=node.line,
-                column=node.column
-            )
+            (_ERR_BINARY_OPERANDS, node.line, node.column, (operator, self._codes.name(left_type), self._codes.name(right_type)))
         )
-        return "Unknown"
+        return TY_UNKNOWN
 
-    def visit_unary_expression(self, node: UnaryExpression) -> str:
+    def visit_unary_expression(self, node: UnaryExpression) -> int:
         """Visit a unary expression node."""
-        right_type = node.right.accept(self)
+        right_type = self._visit(node.right)
 
         # Example type checking for unary operators
-        if node.operator == "-":
-            if right_type in ["Int", "Float"]:
+        operator = node.operator
+        if operator == "-":
+            if (_NUMERIC_MASK >> right_type) & 1:
                 return right_type
-        elif node.operator == "!":
-            if right_type == "Boolean":
-                return "Boolean"
+        elif operator == "!":
+            if right_type == TY_BOOL:
+                return TY_BOOL
 
         # Error case
         self.errors.append(
-            TypeError(
-                message=f"Cannot apply unary operator '{node.operator}' to type '{right_type}'",
-                line=node.line,
-                column=node.column
-            )
+            (_ERR_UNARY_OPERAND, node.line, node.column, (operator, self._codes.name(right_type)))
         )
-        return "Unknown"
+        return TY_UNKNOWN
 
     def visit_variable_declaration(self, node: VariableDeclaration) -> Any:
         """Visit a variable declaration node."""
         # If there's an initializer, check its type
-        init_type = "Void"
+        init_type = TY_VOID
         if node.initializer is not None:
-            init_type = node.initializer.accept(self)
+            init_type = self._visit(node.initializer)
 
         # If there's a type annotation, ensure the initializer matches
         if node.type_annotation is not None:
             if node.type_annotation not in self.types:
                 self.errors.append(
-                    TypeError(
-                        message=f"Unknown type '{node.type_annotation}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_UNKNOWN_TYPE, node.line, node.column, (node.type_annotation,))
                 )
-            elif node.initializer is not None and init_type != node.type_annotation:
+            elif node.initializer is not None and init_type != self._codes.code(node.type_annotation):
                 self.errors.append(
-                    TypeError(
-                        message=f"Cannot assign a value of type '{init_type}' to a variable of type '{node.type_annotation}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_ASSIGN_TYPE, node.line, node.column, (self._codes.name(init_type), node.type_annotation))
                 )
 
-        # Determine the final type (annotation or inferred)
-        var_type = node.type_annotation if node.type_annotation is not None else init_type
+        # Determine the final type (annotation or inferred), as the one shared
+        # copy of the type name kept by type_codes; unknown types have no copy
+        # there and keep their own name
+        if node.type_annotation is not None:
+            var_type = type_name(type_code(node.type_annotation))
+            if var_type != node.type_annotation:
+                var_type = node.type_annotation
+        else:
+            var_type = self._codes.name(init_type)
 
         # Create a variable symbol and add it to the symbol table
-        if self.symbol_table.contains_local(node.name.name):
-            self.errors.append(
-                TypeError(
-                    message=f"Variable '{node.name.name}' is already defined in this scope",
-                    line=node.line,
-                    column=node.column
-                )
+        if not self.symbol_table.try_define(
+            VariableSymbol(
+                name=node.name.name,
+                type_name=var_type
             )
-        else:
-            self.symbol_table.define(
-                VariableSymbol(
-                    name=node.name.name,
-                    type_name=var_type
-                )
+        ):
+            self.errors.append(
+                (_ERR_VARIABLE_REDEFINED, node.line, node.column, (node.name.name,))
             )
 
         return None
@@ -203,28 +381,29 @@ class TypeChecker(ASTVisitor):
 
     def visit_function_declaration(self, node: FunctionDeclaration) -> Any:
         """Visit a function declaration node."""
-        # Create a new function symbol
+        # Create a new function symbol, with its parameter list built at its
+        # final size
         func_symbol = FunctionSymbol(
             name=node.name.name,
             type_name=node.return_type,
-            parameters=[]
+            parameters=[
+                VariableSymbol(
+                    name=param.name.name,
+                    type_name=param.type_annotation
+                )
+                for param in node.parameters
+            ]
         )
 
         # Add the function to the current scope
-        if self.symbol_table.contains_local(node.name.name):
+        if not self.symbol_table.try_define(func_symbol):
             self.errors.append(
-                TypeError(
-                    message=f"Function '{node.name.name}' is already defined in this scope",
-                    line=node.line,
-                    column=node.column
-                )
+                (_ERR_FUNCTION_REDEFINED, node.line, node.column, (node.name.name,))
             )
-        else:
-            self.symbol_table.define(func_symbol)
 
         # Create a new scope for the function body
-        function_scope = self.symbol_table.create_child_scope(node.name.name)
         previous_scope = self.symbol_table
+        function_scope = SymbolTable.acquire(previous_scope, node.name.name)
         self.symbol_table = function_scope
 
         # Save previous function and set current function
@@ -232,21 +411,18 @@ class TypeChecker(ASTVisitor):
         self.current_function = func_symbol
 
         # Add parameters to the function scope
-        for param in node.parameters:
-            param_symbol = VariableSymbol(
-                name=param.name.name,
-                type_name=param.type_annotation
-            )
+        for param_symbol in func_symbol.parameters:
             self.symbol_table.define(param_symbol)
-            func_symbol.parameters.append(param_symbol)
 
         # Type check the function body
+        visit = self._visit
         for statement in node.body:
-            statement.accept(self)
+            visit(statement)
 
         # Restore previous scope and function
         self.symbol_table = previous_scope
         self.current_function = previous_function
+        function_scope.release()
 
         return None
 
@@ -260,33 +436,23 @@ class TypeChecker(ASTVisitor):
         # Check if we're in a function
         if self.current_function is None:
             self.errors.append(
-                TypeError(
-                    message="Return statement outside of function",
-                    line=node.line,
-                    column=node.column
-                )
+                (_ERR_RETURN_OUTSIDE_FUNCTION, node.line, node.column, ())
             )
+            if self.strict_visit_on_error and node.value is not None:
+                self._visit(node.value)
             return None
 
         # Check the return type
         if node.value is None:
-            if self.current_function.type_name != "Void":
+            if self.current_function.type_code != TY_VOID:
                 self.errors.append(
-                    TypeError(
-                        message=f"Function '{self.current_function.name}' must return a value of type '{self.current_function.type_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_MISSING_RETURN_VALUE, node.line, node.column, (self.current_function.name, self.current_function.type_name))
                 )
         else:
-            return_type = node.value.accept(self)
-            if return_type != self.current_function.type_name:
+            return_type = self._visit(node.value)
+            if return_type != self._symbol_type(self.current_function):
                 self.errors.append(
-                    TypeError(
-                        message=f"Cannot return a value of type '{return_type}' from a function with return type '{self.current_function.type_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_RETURN_TYPE, node.line, node.column, (self._codes.name(return_type), self.current_function.type_name))
                 )
 
         return None
@@ -295,100 +461,104 @@ class TypeChecker(ASTVisitor):
 
     def visit_block_statement(self, node: BlockStatement) -> Any:
         """Visit a block statement node."""
+        # A block that declares nothing can share the enclosing scope
+        visit = self._visit
+        if not node.declares_vars:
+            for statement in node.statements:
+                visit(statement)
+            return None
+
         # Create a new scope for the block
-        block_scope = self.symbol_table.create_child_scope()
         previous_scope = self.symbol_table
+        block_scope = SymbolTable.acquire(previous_scope)
         self.symbol_table = block_scope
 
         # Type check the statements in the block
         for statement in node.statements:
-            statement.accept(self)
+            visit(statement)
 
         # Restore the previous scope
         self.symbol_table = previous_scope
+        block_scope.release()
 
         return None
 
     def visit_if_statement(self, node: IfStatement) -> Any:
         """Visit an if statement node."""
+        condition, else_branch = node.condition, node.else_branch
+
         # Check that the condition is a boolean
-        condition_type = node.condition.accept(self)
-        if condition_type != "Boolean":
+        condition_type = self._visit(condition)
+        if condition_type != TY_BOOL:
             self.errors.append(
-                TypeError(
-                    message=f"If condition must be a Boolean, got '{condition_type}'",
-                    line=node.condition.line,
-                    column=node.condition.column
-                )
+                (_ERR_IF_CONDITION, condition.line, condition.column, (self._codes.name(condition_type),))
             )
 
         # Type check the then and else branches
-        node.then_branch.accept(self)
-        if node.else_branch is not None:
-            node.else_branch.accept(self)
+        self._visit(node.then_branch)
+        if else_branch is not None:
+            self._visit(else_branch)
 
         return None
 
     def visit_while_statement(self, node: WhileStatement) -> Any:
         """Visit a while statement node."""
+        condition = node.condition
+
         # Check that the condition is a boolean
-        condition_type = node.condition.accept(self)
-        if condition_type != "Boolean":
+        condition_type = self._visit(condition)
+        if condition_type != TY_BOOL:
             self.errors.append(
-                TypeError(
-                    message=f"While condition must be a Boolean, got '{condition_type}'",
-                    line=node.condition.line,
-                    column=node.condition.column
-                )
+                (_ERR_WHILE_CONDITION, condition.line, condition.column, (self._codes.name(condition_type),))
             )
 
         # Type check the body
-        node.body.accept(self)
+        self._visit(node.body)
 
         return None
 
     def visit_for_statement(self, node: ForStatement) -> Any:
         """Visit a for statement node."""
-        # Create a new scope for the for loop
-        for_scope = self.symbol_table.create_child_scope()
+        # Create a new scope for the for loop, unless it declares nothing for
+        # it to hold
+        initializer, condition, increment = node.initializer, node.condition, node.increment
         previous_scope = self.symbol_table
-        self.symbol_table = for_scope
+        if node.declares_vars:
+            self.symbol_table = SymbolTable.acquire(previous_scope)
 
         # Type check the initializer, condition, and increment
-        if node.initializer is not None:
-            node.initializer.accept(self)
+        if initializer is not None:
+            self._visit(initializer)
 
-        if node.condition is not None:
-            condition_type = node.condition.accept(self)
-            if condition_type != "Boolean":
+        if condition is not None:
+            condition_type = self._visit(condition)
+            if condition_type != TY_BOOL:
                 self.errors.append(
-                    TypeError(
-                        message=f"For condition must be a Boolean, got '{condition_type}'",
-                        line=node.condition.line,
-                        column=node.condition.column
-                    )
+                    (_ERR_FOR_CONDITION, condition.line, condition.column, (self._codes.name(condition_type),))
                 )
 
-        if node.increment is not None:
-            node.increment.accept(self)
+        if increment is not None:
+            self._visit(increment)
 
         # Type check the body
-        node.body.accept(self)
+        self._visit(node.body)
 
         # Restore the previous scope
-        self.symbol_table = previous_scope
+        if self.symbol_table is not previous_scope:
+            self.symbol_table.release()
+            self.symbol_table = previous_scope
 
         return None
 
     def visit_expression_statement(self, node: ExpressionStatement) -> Any:
         """Visit an expression statement node."""
-        node.expression.accept(self)
+        self._visit(node.expression)
         return None
 
-    def visit_call_expression(self, node: CallExpression) -> str:
+    def visit_call_expression(self, node: CallExpression) -> int:
         """Visit a call expression node."""
         # Determine the type of the callee
-        callee_type = node.callee.accept(self)
+        callee_type = self._visit(node.callee)
 
         # If it's a function call
         if isinstance(node.callee, Identifier):
@@ -397,60 +567,52 @@ class TypeChecker(ASTVisitor):
 
             if func_symbol is None:
                 self.errors.append(
-                    TypeError(
-                        message=f"Undefined function '{func_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_UNDEFINED_FUNCTION, node.line, node.column, (func_name,))
                 )
-                return "Unknown"
+                self._visit_skipped(node.arguments)
+                return TY_UNKNOWN
 
             # Check if it's callable
             if not isinstance(func_symbol, FunctionSymbol):
                 self.errors.append(
-                    TypeError(
-                        message=f"Cannot call non-function '{func_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_NOT_A_FUNCTION, node.line, node.column, (func_name,))
                 )
-                return "Unknown"
+                self._visit_skipped(node.arguments)
+                return TY_UNKNOWN
 
             # Check the number of arguments
-            if len(node.arguments) != len(func_symbol.parameters):
+            arguments = node.arguments
+            param_types = func_symbol.param_types
+            if len(arguments) != len(param_types):
                 self.errors.append(
-                    TypeError(
-                        message=f"Function '{func_name}' expects {len(func_symbol.parameters)} arguments, but got {len(node.arguments)}",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_ARGUMENT_COUNT, node.line, node.column, (func_name, len(param_types), len(arguments)))
                 )
+                self._visit_skipped(arguments)
             else:
                 # Check argument types
-                for i, (arg, param) in enumerate(zip(node.arguments, func_symbol.parameters)):
-                    arg_type = arg.accept(self)
-                    if arg_type != param.type_name and param.type_name != "Any":
-                        self.errors.append(
-                            TypeError(
-                                message=f"Argument {i+1} to function '{func_name}' must be of type '{param.type_name}', got '{arg_type}'",
-                                line=arg.line if hasattr(arg, 'line') else node.line,
-                                column=arg.column if hasattr(arg, 'column') else node.column
-                            )
+                visit = self._visit
+                errors_append = self.errors.append
+                for i in range(len(arguments)):
+                    arg = arguments[i]
+                    arg_type = visit(arg)
+                    param_type = param_types[i]
+                    if param_type == TY_UNKNOWN:
+                        param_type = self._symbol_type(func_symbol.parameters[i])
+                    if arg_type != param_type and param_type != TY_ANY:
+                        errors_append(
+                            (_ERR_ARGUMENT_TYPE, arg.line, arg.column, (i + 1, func_name, func_symbol.parameters[i].type_name, self._codes.name(arg_type)))
                         )
 
-            return func_symbol.type_name
+            return self._symbol_type(func_symbol)
 
         # Error case
         self.errors.append(
-            TypeError(
-                message=f"Expression of type '{callee_type}' is not callable",
-                line=node.line,
-                column=node.column
-            )
+            (_ERR_NOT_CALLABLE, node.line, node.column, (self._codes.name(callee_type),))
         )
-        return "Unknown"
+        self._visit_skipped(node.arguments)
+        return TY_UNKNOWN
 
-    def visit_assignment_expression(self, node: AssignmentExpression) -> str:
+    def visit_assignment_expression(self, node: AssignmentExpression) -> int:
         """Visit an assignment expression node."""
         # Get the target variable type
         if isinstance(node.target, Identifier):
@@ -459,95 +621,87 @@ class TypeChecker(ASTVisitor):
 
             if var_symbol is None:
                 self.errors.append(
-                    TypeError(
-                        message=f"Undefined variable '{var_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_UNDEFINED_VARIABLE, node.line, node.column, (var_name,))
                 )
-                return "Unknown"
+                self._visit_skipped([node.value])
+                return TY_UNKNOWN
 
             # Check if the variable is mutable
             if isinstance(var_symbol, VariableSymbol) and not var_symbol.is_mutable:
                 self.errors.append(
-                    TypeError(
-                        message=f"Cannot assign to immutable variable '{var_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_IMMUTABLE_ASSIGNMENT, node.line, node.column, (var_name,))
                 )
 
             # Check value type compatibility
-            value_type = node.value.accept(self)
-            if value_type != var_symbol.type_name:
+            value_type = self._visit(node.value)
+            if value_type != self._symbol_type(var_symbol):
                 self.errors.append(
-                    TypeError(
-                        message=f"Cannot assign a value of type '{value_type}' to a variable of type '{var_symbol.type_name}'",
-                        line=node.line,
-                        column=node.column
-                    )
+                    (_ERR_ASSIGN_TYPE, node.line, node.column, (self._codes.name(value_type), var_symbol.type_name))
                 )
 
-            return var_symbol.type_name
+            return self._symbol_type(var_symbol)
 
         # Error case
         self.errors.append(
-            TypeError(
-                message="Invalid assignment target",
-                line=node.line,
-                column=node.column
-            )
+            (_ERR_INVALID_ASSIGNMENT_TARGET, node.line, node.column, ())
         )
-        return "Unknown"
+        self._visit_skipped([node.target, node.value])
+        return TY_UNKNOWN
 
-    def visit_array_literal(self, node: ArrayLiteral) -> str:
+    def visit_array_literal(self, node: ArrayLiteral) -> int:
         """Visit an array literal node."""
-        if not node.elements:
-            return "Array<Any>"
+        elements = node.elements
+        if not elements:
+            return TY_EMPTY_ARRAY
+
+        # An array of literals of one kind needs no element visits, as
+        # literals have a fixed type and never report errors
+        first_class = type(elements[0])
+        literal_type = _LITERAL_TYPES.get(first_class)
+        if literal_type is not None and all(type(element) is first_class for element in elements):
+            return self._codes.array_of(literal_type)
 
         # Determine the element type
-        element_type = node.elements[0].accept(self)
+        element_type = self._visit(elements[0])
 
         # Check that all elements have the same type
-        for element in node.elements[1:]:
-            current_type = element.accept(self)
+        visit = self._visit
+        errors_append = self.errors.append
+        for element in elements[1:]:
+            current_type = visit(element)
             if current_type != element_type:
-                self.errors.append(
-                    TypeError(
-                        message=f"Array elements must all have the same type. Expected '{element_type}', got '{current_type}'",
-                        line=element.line if hasattr(element, 'line') else node.line,
-                        column=element.column if hasattr(element, 'column') else node.column
-                    )
+                errors_append(
+                    (_ERR_ARRAY_ELEMENT_TYPE, element.line, element.column, (self._codes.name(element_type), self._codes.name(current_type)))
                 )
 
-        return f"Array<{element_type}>"
+        return self._codes.array_of(element_type)
 
-    def visit_index_expression(self, node: IndexExpression) -> str:
+    def visit_index_expression(self, node: IndexExpression) -> int:
         """Visit an index expression node."""
-        array_type = node.array.accept(self)
-        index_type = node.index.accept(self)
+        array_type = self._visit(node.array)
+        index_type = self._visit(node.index)
 
         # Check if the indexed object is an array
-        if not array_type.startswith("Array<"):
+        element_type = self._codes.element_of(array_type)
+        if element_type is None:
             self.errors.append(
-                TypeError(
-                    message=f"Cannot index into non-array type '{array_type}'",
-                    line=node.line,
-                    column=node.column
-                )
+                (_ERR_INDEX_NON_ARRAY, node.line, node.column, (self._codes.name(array_type),))
             )
-            return "Unknown"
+            return TY_UNKNOWN
 
         # Check if the index is an integer
-        if index_type != "Int":
+        if index_type != TY_INT:
             self.errors.append(
-                TypeError(
-                    message=f"Array index must be an Int, got '{index_type}'",
-                    line=node.index.line if hasattr(node.index, 'line') else node.line,
-                    column=node.index.column if hasattr(node.index, 'column') else node.column
-                )
+                (_ERR_INDEX_TYPE, node.index.line, node.index.column, (self._codes.name(index_type),))
             )
 
-        # Extract the element type from the array type (e.g., "Array<Int>" -> "Int")
-        element_type = array_type[6:-1]
         return element_type
+
+
+def check_source(source: str, cache_dir: Optional[str] = None) -> List[TypeError]:
+    """Parse and type check a source text.
+
+    This is a module-level function so that it can be run in a worker process.
+    """
+    cache = CheckCache(cache_dir) if cache_dir is not None else None
+    return TypeChecker(cache=cache).check(Parser(source).parse(), source=source)
@@ -0,0 +1,163 @@
+"""Integer codes for AetherScript type names.
+
+The type checker works on small integer codes rather than type name strings.
+Built-in types have fixed codes, and array types such as ``Array<Int>`` are
+given the next free code the first time they are seen. Any other name is an
+unknown type, with the code of ``Unknown``: codes are kept for the life of
+the process, so names that are not types (say, an annotation typed halfway
+in an editor) must not be given one. A LocalTypeCodes table gives unknown
+names codes of their own for as long as one type checker needs them.
+"""
+
+import sys
+import threading
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+
+class TypeCode(IntEnum):
+    """Codes of the built-in types."""
+
+    VOID = 0
+    INT = 1
+    FLOAT = 2
+    STRING = 3
+    BOOLEAN = 4
+    UNKNOWN = 5
+    ANY = 6
+    ARRAY = 7
+    MAP = 8
+    ELEMENT = 9
+    ENERGY = 10
+    SPIRIT = 11
+    MATTER = 12
+
+
+# Name of each code, indexed by code; only needed to format messages
+CODE_TO_NAME: List[str] = [sys.intern(name) for name in (
+    "Void", "Int", "Float", "String", "Boolean", "Unknown", "Any",
+    "Array", "Map", "Element", "Energy", "Spirit", "Matter"
+)]
+
+_NAME_TO_CODE: Dict[str, int] = {name: code for code, name in enumerate(CODE_TO_NAME)}
+_lock = threading.Lock()
+
+
+_UNKNOWN = int(TypeCode.UNKNOWN)
+
+
+def type_code(name: str) -> int:
+    """Get the code of a type name.
+
+    An array type gets the code of the array of its element type. Any other
+    name without a code, or an array of one, is an unknown type.
+    """
+    code = _NAME_TO_CODE.get(name)
+    if code is None:
+        if name.startswith("Array<") and name.endswith(">"):
+            element_name = name[6:-1]
+            element_code = type_code(element_name)
+            if element_code == _UNKNOWN and element_name != CODE_TO_NAME[_UNKNOWN]:
+                return _UNKNOWN
+            return array_of(element_code)
+        return _UNKNOWN
+    return code
+
+
+def _register(name: str) -> int:
+    """Get the code of a type name, assigning it the next free one if needed."""
+    with _lock:
+        code = _NAME_TO_CODE.get(name)
+        if code is None:
+            code = len(CODE_TO_NAME)
+            CODE_TO_NAME.append(sys.intern(name))
+            _NAME_TO_CODE[CODE_TO_NAME[code]] = code
+    return code
+
+
+def type_name(code: int) -> str:
+    """Get the type name of a code."""
+    return CODE_TO_NAME[code]
+
+
+# Array<T> code for each element code T, and the reverse (-1 for codes that
+# are not array types), so array type names are only built and parsed once;
+# array_of fills in both directions, so indexing a constructed array type
+# never parses its name
+_ARRAY_OF: Dict[int, int] = {}
+_ELEMENT_OF: Dict[int, int] = {}
+
+
+def array_of(element_code: int) -> int:
+    """Get the code of the array type with the given element type."""
+    code = _ARRAY_OF.get(element_code)
+    if code is None:
+        code = _ARRAY_OF[element_code] = _register(f"Array<{type_name(element_code)}>")
+        _ELEMENT_OF[code] = element_code
+    return code
+
+
+def element_of(code: int) -> Optional[int]:
+    """Get the element type code of an array type, or None if it is not one."""
+    element_code = _ELEMENT_OF.get(code)
+    if element_code is None:
+        name = type_name(code)
+        # e.g. "Array<Int>" -> "Int"
+        element_code = _ELEMENT_OF[code] = type_code(name[6:-1]) if name.startswith("Array<") else -1
+    return element_code if element_code >= 0 else None
+
+
+# Codes given by LocalTypeCodes start here, well past any global code
+_LOCAL_BASE = 1 << 30
+
+
+class LocalTypeCodes:
+    """Type codes that also cover unknown type names.
+
+    Unknown names all share the code of ``Unknown`` in the global table, so
+    on their own they would compare equal to each other and be reported as
+    ``Unknown``. This table gives each unknown name, and each array of one,
+    a code of its own from ``_LOCAL_BASE`` up; it is dropped with its owner,
+    so the global table still only grows with real types. Known names keep
+    their global codes.
+    """
+
+    def __init__(self) -> None:
+        self._names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._elements: Dict[int, int] = {}
+
+    def code(self, name: str) -> int:
+        """Get the code of a type name."""
+        code = type_code(name)
+        if code != _UNKNOWN or name == CODE_TO_NAME[_UNKNOWN]:
+            return code
+        if name.startswith("Array<") and name.endswith(">"):
+            return self.array_of(self.code(name[6:-1]))
+        return self._local(name)
+
+    def _local(self, name: str) -> int:
+        """Get the local code of a type name, assigning the next free one if needed."""
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = _LOCAL_BASE + len(self._names)
+            self._names.append(name)
+        return code
+
+    def name(self, code: int) -> str:
+        """Get the type name of a code."""
+        return type_name(code) if code < _LOCAL_BASE else self._names[code - _LOCAL_BASE]
+
+    def array_of(self, element_code: int) -> int:
+        """Get the code of the array type with the given element type."""
+        if element_code < _LOCAL_BASE:
+            return array_of(element_code)
+        code = self._local(f"Array<{self.name(element_code)}>")
+        self._elements[code] = element_code
+        return code
+
+    def element_of(self, code: int) -> Optional[int]:
+        """Get the element type code of an array type, or None if it is not one."""
+        if code < _LOCAL_BASE:
+            return element_of(code)
+        return self._elements.get(code)
@@ -1,40 +1,210 @@
 """Language Server Protocol implementation for AetherScript."""
 
 import os
+import re
+import sys
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional, Any, Union
+import multiprocessing
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Any, Set, Tuple, Union
 import json
 
 from pygls.server import LanguageServer
+from pygls.uris import from_fs_path, to_fs_path
 from pygls.lsp.types import (
     CompletionItem, CompletionItemKind, CompletionList, CompletionOptions, CompletionParams,
     Diagnostic, DiagnosticSeverity, DidChangeTextDocumentParams, DidOpenTextDocumentParams,
     DidSaveTextDocumentParams, DocumentFormattingParams, DocumentSymbol, DocumentSymbolParams,
-    Hover, HoverParams, InitializeParams, InitializeResult, Location, MarkupContent, MarkupKind,
+    Hover, HoverParams, InitializeParams, InitializeResult, InitializedParams, Location, MarkupContent, MarkupKind,
     Position, Range, ReferenceParams, SymbolInformation, SymbolKind, TextDocumentPositionParams,
     TextEdit, WorkspaceEdit, WorkspaceSymbolParams
 )
 
 from aetherscript.parser.lexer import Lexer, Token, TokenType
-from aetherscript.parser.parser import Parser
-from aetherscript.analyzer.type_checker import TypeChecker, TypeError
+from aetherscript.parser.parser import Parser, ParseError
+from aetherscript.parser.incremental import offset_at, reparse
+from aetherscript.analyzer.check_cache import CheckCache
+from aetherscript.analyzer.type_checker import TypeChecker, TypeError, check_source
 from aetherscript.analyzer.semantic_analyzer import SemanticAnalyzer, Definition, Reference, Location as AetherLocation
 
 
-# Set up logging
-logging.basicConfig(filename="aetherscript_lsp.log", level=logging.DEBUG, filemode="w")
+# Logging is configured by the entry point (server_main)
 logger = logging.getLogger("aetherscript_lsp")
 
+# Runs of identifier characters, which is what hover, completion and the
+# other position-based requests treat as the word at a position
+WORD_PATTERN = re.compile(r"\w+")
+
+# Sources reported with each kind of diagnostic
+PARSER_SOURCE = "aetherscript-parser"
+TYPE_CHECKER_SOURCE = "aetherscript-type-checker"
+SEMANTIC_ANALYZER_SOURCE = "aetherscript-semantic-analyzer"
+
+# File name extension of AetherScript sources
+SOURCE_EXTENSION = ".aether"
+
+# Symbol kind reported for each kind of definition
+SYMBOL_KINDS: Dict[str, SymbolKind] = {
+    "function": SymbolKind.Function,
+    "variable": SymbolKind.Variable,
+    "parameter": SymbolKind.Variable,
+}
+
+# A semantic error message and the line:column it ends with
+SEMANTIC_ERROR_PATTERN = re.compile(r"^(?P<message>.*) at (?P<line>\d+):(?P<column>\d+)\s*$")
+
+
+def _diagnostic(line: int, start: int, end: int, message: str,
+                severity: DiagnosticSeverity, source: str) -> Diagnostic:
+    """Build a diagnostic spanning part of one line (all zero-based).
+
+    The models are built with construct(), skipping pydantic validation,
+    since every value comes from the analyzers and is already well formed.
+    """
+    return Diagnostic.construct(
+        range=Range.construct(
+            start=Position.construct(line=line, character=start),
+            end=Position.construct(line=line, character=end)
+        ),
+        message=message,
+        severity=severity,
+        source=source
+    )
+
+
+def _parse_diagnostics(errors: List[ParseError]) -> List[Diagnostic]:
+    """Convert parse errors to diagnostics."""
+    return [
+        _diagnostic(
+            error.token.line - 1, error.token.column - 1, error.token.column - 1 + len(error.token.value),
+            error.message, DiagnosticSeverity.Error, PARSER_SOURCE
+        )
+        for error in errors
+    ]
+
+
+def _type_diagnostics(errors: List[TypeError]) -> List[Diagnostic]:
+    """Convert type errors to diagnostics."""
+    return [
+        _diagnostic(
+            error.line - 1, error.column - 1, error.column,
+            error.message, DiagnosticSeverity.Error, TYPE_CHECKER_SOURCE
+        )
+        for error in errors
+    ]
+
+
+def _semantic_diagnostics(errors: List[str]) -> List[Diagnostic]:
+    """Convert semantic errors, which end with " at line:column", to diagnostics."""
+    diagnostics = []
+    for error in errors:
+        match = SEMANTIC_ERROR_PATTERN.match(error)
+        if match is not None:
+            line = int(match.group("line"))
+            column = int(match.group("column"))
+            diagnostics.append(_diagnostic(
+                line - 1, column - 1, column,
+                match.group("message"), DiagnosticSeverity.Warning, SEMANTIC_ANALYZER_SOURCE
+            ))
+        else:
+            # Fallback to a generic location
+            diagnostics.append(_diagnostic(
+                0, 0, 1, error, DiagnosticSeverity.Warning, SEMANTIC_ANALYZER_SOURCE
+            ))
+    return diagnostics
+
+
+# Keywords offered by completion
+KEYWORDS = (
+    "if", "else", "elif", "while", "for", "return", "break", "continue",
+    "function", "spell", "ritual", "conjure", "entity", "realm", "dimension"
+)
+
 
 class AetherScriptLanguageServer(LanguageServer):
     """Language Server Protocol implementation for AetherScript."""
 
-    def __init__(self):
-        """Initialize the language server."""
+    def __init__(self, cache_dir: Optional[str] = None):
+        """Initialize the language server.
+
+        If ``cache_dir`` is given, type check results are cached there.
+        """
         super().__init__("aetherscript-ls", "v0.1.0")
 
-        # Document cache
-        self.document_cache: Dict[str, str] = {}
+        # Type check cache shared by all documents
+        self.check_cache = CheckCache(cache_dir) if cache_dir is not None else None
+
+        # Worker processes for type checking many documents at once, and the
+        # check of the workspace's documents started once the client is ready
+        self._check_pool: Optional[ProcessPoolExecutor] = None
+        self._workspace_check: Optional[asyncio.Future] = None
+
+        # Worker threads that analyze documents off the event loop, and a
+        # lock per document so one analysis finishes before the next starts
+        # (each re-parse builds on the previous parse)
+        self._exec = ThreadPoolExecutor(max_workers=2)
+        self._analysis_locks: Dict[str, asyncio.Lock] = {}
+
+        # Latest version of each document, so that diagnostics computed for
+        # an older version are not published
+        self.doc_version: Dict[str, Optional[int]] = {}
+
+        # Analyses waiting for edits to pause, and the earliest offset edited
+        # since each document was last analyzed
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._pending_offsets: Dict[str, int] = {}
+        self._debounce_s = 0.075
+
+        # Hash of the text each document was last analyzed with, and the
+        # diagnostics that analysis produced
+        self._analysis_hash: Dict[str, bytes] = {}
+        self._diagnostics: Dict[str, List[Diagnostic]] = {}
+
+        # Diagnostics waiting to be published together at the end of the
+        # current event loop iteration, and the scheduled flush
+        self._diag_queue: Dict[str, List[Diagnostic]] = {}
+        self._diag_flush: Optional[asyncio.Handle] = None
+
+        # Workspace symbol index: the (lowercased name, name, definition) of
+        # every definition in each document, and for documents that have been
+        # searched, the entries containing each trigram of a lowercased name
+        self._ws_index: Dict[str, List[Tuple[str, str, Definition]]] = {}
+        self._ws_trigrams: Dict[str, Dict[str, List[int]]] = {}
+
+        # Per document: the text the entry was built from, its lines, the
+        # (start, end, word) spans of the lines looked at so far, and the word
+        # found at each (line, character) looked up so far
+        self._line_cache: Dict[str, Tuple[
+            str,
+            List[str],
+            Dict[int, List[Tuple[int, int, str]]],
+            Dict[Tuple[int, int], Tuple[int, int, str]],
+        ]] = {}
+
+        # Completion items of the keywords, built once and indexed by their
+        # first letter, and of each document's definitions, built on first use
+        # after each analysis
+        self._keyword_items: List[CompletionItem] = [
+            CompletionItem(
+                label=keyword,
+                kind=CompletionItemKind.Keyword,
+                detail="keyword",
+                insert_text=keyword
+            )
+            for keyword in KEYWORDS
+        ]
+        self._keyword_index: Dict[str, List[CompletionItem]] = {}
+        for item in self._keyword_items:
+            self._keyword_index.setdefault(item.label[0], []).append(item)
+        self._definition_items: Dict[str, Tuple[List[CompletionItem], List[int]]] = {}
+
+        # Symbol information of each document's definitions, in the order of
+        # its workspace symbol index entries, built on first use after each
+        # analysis
+        self._symbols: Dict[str, List[SymbolInformation]] = {}
 
         # Analyzers
         self.parsers: Dict[str, Parser] = {}
@@ -44,8 +214,94 @@ class AetherScriptLanguageServer(LanguageServer):
         # Register LSP methods
         self._register_methods()
 
+    @property
+    def check_pool(self) -> ProcessPoolExecutor:
+        """Get the worker process pool, starting it on first use."""
+        if self._check_pool is None:
+            # Spawned rather than forked, as the server runs worker threads
+            self._check_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._check_pool
+
+    def shutdown(self):
+        """Shut down the worker threads and processes along with the server."""
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        if self._workspace_check is not None:
+            self._workspace_check.cancel()
+            self._workspace_check = None
+        self._exec.shutdown(wait=False)
+        if self._check_pool is not None:
+            self._check_pool.shutdown()
+            self._check_pool = None
+        super().shutdown()
+
+    async def check_sources(self, sources: Dict[str, str]) -> Dict[str, List[TypeError]]:
+        """Type check many documents (uri -> text) in worker processes.
+
+        Pure Python type checking holds the GIL, so documents are checked in
+        separate processes rather than threads. Workers share the type check
+        cache, so unchanged documents are not checked again.
+        """
+        cache_dir = self.check_cache.directory if self.check_cache is not None else None
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.check_pool, check_source, text, cache_dir)
+            for text in sources.values()
+        ))
+        return dict(zip(sources, results))
+
+    async def on_initialized(self, params: InitializedParams) -> None:
+        """Start type checking the workspace's documents once the client is ready."""
+        self._workspace_check = asyncio.ensure_future(self._check_workspace())
+
+    async def _check_workspace(self) -> None:
+        """Publish type check diagnostics for the workspace's unopened documents."""
+        loop = asyncio.get_running_loop()
+        sources = await loop.run_in_executor(self._exec, self._read_workspace_sources)
+        if not sources:
+            return
+
+        logger.info("Type checking %d workspace documents", len(sources))
+        results = await self.check_sources(sources)
+        for uri, errors in results.items():
+            # Documents opened meanwhile have been analyzed in full
+            if uri not in self.workspace.documents:
+                self._queue_diagnostics(uri, _type_diagnostics(errors))
+
+    def _read_workspace_sources(self) -> Dict[str, str]:
+        """Read the unopened AetherScript sources of the workspace (uri -> text)."""
+        roots = [to_fs_path(folder.uri) for folder in self.workspace.folders.values()]
+        if not roots and self.workspace.root_path:
+            roots = [self.workspace.root_path]
+
+        sources: Dict[str, str] = {}
+        for root in roots:
+            for directory, subdirectories, files in os.walk(root):
+                # Skip hidden directories, such as .git
+                subdirectories[:] = [name for name in subdirectories if not name.startswith(".")]
+                for name in files:
+                    if not name.endswith(SOURCE_EXTENSION):
+                        continue
+                    path = os.path.join(directory, name)
+                    uri = from_fs_path(path)
+                    if uri in sources or uri in self.workspace.documents:
+                        continue
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            sources[uri] = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        logger.warning("Could not read workspace document: %s", path)
+        return sources
+
     def _register_methods(self):
         """Register LSP methods."""
+        self.feature(
+            self.lsp.methods.INITIALIZED,
+            self.on_initialized
+        )
         self.feature(
             self.lsp.methods.TEXT_DOCUMENT_DID_OPEN,
             self.on_did_open
@@ -92,7 +348,7 @@ class AetherScriptLanguageServer(LanguageServer):
             capabilities={
                 "textDocumentSync": {
                     "openClose": True,
-                    "change": 1,  # Full content sync
+                    "change": 2,  # Incremental content sync
                     "save": {"includeText": True}
                 },
                 "completionProvider": {
@@ -113,42 +369,131 @@ class AetherScriptLanguageServer(LanguageServer):
         uri = params.text_document.uri
         text = params.text_document.text
 
-        logger.info(f"Document opened: {uri}")
+        logger.info("Document opened: %s", uri)
 
-        # Cache the document
-        self.document_cache[uri] = text
+        self.doc_version[uri] = params.text_document.version
+        self._cancel_pending(uri)
 
         # Analyze the document
-        await self._analyze_document(uri, text)
+        await self._analyze_document(uri, text, update_cache=True)
 
     async def on_did_change(self, params: DidChangeTextDocumentParams) -> None:
         """Handle text document change event."""
         uri = params.text_document.uri
 
-        # Get the full content change
-        if len(params.content_changes) > 0:
-            text = params.content_changes[0].text
-            self.document_cache[uri] = text
+        text = self._document_text(uri)
+        if text is not None and len(params.content_changes) > 0:
+            # pygls has applied the changes already; the text before the
+            # earliest one is as it was, so its start is found in the new text
+            changed_offset = len(text)
+            for change in params.content_changes:
+                change_range = getattr(change, "range", None)
+                if change_range is None:
+                    # Full content change
+                    changed_offset = 0
+                    break
+                changed_offset = min(
+                    changed_offset, offset_at(text, change_range.start.line, change_range.start.character)
+                )
 
-            # Analyze the document
-            await self._analyze_document(uri, text)
+            self.doc_version[uri] = params.text_document.version
+
+            # Analyze the document once edits pause, re-parsing from the
+            # earliest change since it was last analyzed
+            pending = self._pending.pop(uri, None)
+            if pending is not None:
+                pending.cancel()
+            self._pending_offsets[uri] = min(changed_offset, self._pending_offsets.get(uri, changed_offset))
+            self._pending[uri] = asyncio.ensure_future(self._debounced_analyze(uri))
+
+    async def _debounced_analyze(self, uri: str) -> None:
+        """Analyze a document after the debounce delay, unless edited again."""
+        try:
+            await asyncio.sleep(self._debounce_s)
+        except asyncio.CancelledError:
+            # Superseded by a later edit
+            return
+
+        self._pending.pop(uri, None)
+        changed_offset = self._pending_offsets.pop(uri, None)
+        text = self._document_text(uri)
+        if text is not None:
+            await self._analyze_document(uri, text, changed_offset)
+
+    def _cancel_pending(self, uri: str) -> None:
+        """Cancel a debounced analysis of a document that is analyzed right away."""
+        pending = self._pending.pop(uri, None)
+        if pending is not None:
+            pending.cancel()
+        self._pending_offsets.pop(uri, None)
 
     async def on_did_save(self, params: DidSaveTextDocumentParams) -> None:
         """Handle text document save event."""
         uri = params.text_document.uri
 
-        if uri in self.document_cache:
-            text = self.document_cache[uri]
+        text = self._document_text(uri)
+        if text is not None:
+            # Take over the pending analysis before waiting on this one, so an
+            # edit arriving meanwhile schedules its own analysis that is kept
+            changed_offset = self._pending_offsets.get(uri)
+            self._cancel_pending(uri)
 
             # Analyze the document
-            await self._analyze_document(uri, text)
+            await self._analyze_document(uri, text, changed_offset, update_cache=True)
+
+    def _document_text(self, uri: str) -> Optional[str]:
+        """Get the text of an open document, or None if it is not open.
+
+        The text is the copy pygls keeps in its workspace, which it updates
+        before each change notification reaches the server's handlers.
+        """
+        document = self.workspace.documents.get(uri)
+        return document.source if document is not None else None
+
+    def _word_at(self, uri: str, line: int, character: int) -> Tuple[int, int, str]:
+        """Find the word touching a position, as (start, end, word).
+
+        Returns an empty word starting and ending at the position if there is
+        none. A document's lines are split once per version of its text, and
+        each line is only scanned for words the first time it is needed. The
+        result for a position is kept too, as hover, definition and references
+        requests tend to follow one another on the same word.
+        """
+        text = self.workspace.get_document(uri).source
+        cached = self._line_cache.get(uri)
+        if cached is None or cached[0] is not text:
+            cached = self._line_cache[uri] = (text, text.split("\n"), {}, {})
+        _, lines, line_spans, words = cached
+
+        word = words.get((line, character))
+        if word is not None:
+            return word
+
+        spans = line_spans.get(line)
+        if spans is None:
+            current_line = lines[line] if line < len(lines) else ""
+            # Words are interned like the names the lexer produces, so looking
+            # them up among the definitions compares them by identity
+            spans = line_spans[line] = [
+                (match.start(), match.end(), sys.intern(match.group()))
+                for match in WORD_PATTERN.finditer(current_line)
+            ]
+
+        # The last word starting at or before the position, if it reaches it
+        index = bisect_right(spans, (character, float("inf"))) - 1
+        if index >= 0 and spans[index][1] >= character:
+            word = spans[index]
+        else:
+            word = (character, character, "")
+        words[(line, character)] = word
+        return word
 
     async def on_completion(self, params: CompletionParams) -> CompletionList:
         """Handle completion request."""
         uri = params.text_document.uri
         position = params.position
 
-        if uri not in self.document_cache:
+        if uri not in self.workspace.documents:
             return CompletionList(is_incomplete=False, items=[])
 
         # Get semantic analyzer
@@ -156,76 +501,76 @@ class AetherScriptLanguageServer(LanguageServer):
         if not semantic_analyzer:
             return CompletionList(is_incomplete=False, items=[])
 
-        # Get current word
+        # Get the part of the current word before the cursor
         line = position.line
         character = position.character
-        text = self.document_cache[uri]
-        lines = text.split("\n")
-        current_line = lines[line] if line < len(lines) else ""
-
-        # Find current word
-        word_start = character
-        while word_start > 0 and (current_line[word_start - 1].isalnum() or current_line[word_start - 1] == "_"):
-            word_start -= 1
-
-        current_word = current_line[word_start:character]
+        word_start, _, word = self._word_at(uri, line, character)
+        current_word = word[:character - word_start]
 
         # Find completions
         completions = []
 
         # Add symbols from the current scope
-        for name, definitions in semantic_analyzer.definitions.items():
-            for definition in definitions:
-                if current_word and not name.startswith(current_word):
-                    continue
-
-                kind = None
-                if definition.kind == "function":
-                    kind = CompletionItemKind.Function
-                elif definition.kind == "variable":
-                    kind = CompletionItemKind.Variable
-                elif definition.kind == "parameter":
-                    kind = CompletionItemKind.Variable
-                else:
-                    kind = CompletionItemKind.Text
-
-                completions.append(
-                    CompletionItem(
-                        label=name,
-                        kind=kind,
-                        detail=f"{definition.kind}: {definition.type_name}",
-                        documentation=definition.detail,
-                        insert_text=name
-                    )
-                )
+        definition_items = self._definition_items.get(uri)
+        if definition_items is None:
+            definition_items = self._definition_items[uri] = self._build_definition_items(semantic_analyzer)
+        items, starts = definition_items
+        first, last = semantic_analyzer.prefix_range(current_word)
+        completions.extend(items[starts[first]:starts[last]])
 
         # Add keywords
-        keywords = [
-            "if", "else", "elif", "while", "for", "return", "break", "continue",
-            "function", "spell", "ritual", "conjure", "entity", "realm", "dimension"
-        ]
+        if current_word:
+            for item in self._keyword_index.get(current_word[0], ()):
+                if item.label.startswith(current_word):
+                    completions.append(item)
+        else:
+            completions.extend(self._keyword_items)
+
+        return CompletionList(is_incomplete=False, items=completions)
 
-        for keyword in keywords:
-            if current_word and not keyword.startswith(current_word):
-                continue
+    def _build_definition_items(self, semantic_analyzer: SemanticAnalyzer) -> Tuple[List[CompletionItem], List[int]]:
+        """Build the completion items of every definition, in name order.
+
+        Returns the items in one flat list, along with the index in it of the
+        first item of each of the analyzer's sorted names (and of the end), so
+        the items of a range of names are a single slice.
+        """
+        by_name: Dict[str, List[CompletionItem]] = {}
+        for name, definition in semantic_analyzer.iter_definitions():
+            kind = None
+            if definition.kind == "function":
+                kind = CompletionItemKind.Function
+            elif definition.kind == "variable":
+                kind = CompletionItemKind.Variable
+            elif definition.kind == "parameter":
+                kind = CompletionItemKind.Variable
+            else:
+                kind = CompletionItemKind.Text
 
-            completions.append(
+            by_name.setdefault(name, []).append(
                 CompletionItem(
-                    label=keyword,
-                    kind=CompletionItemKind.Keyword,
-                    detail="keyword",
-                    insert_text=keyword
+                    label=name,
+                    kind=kind,
+                    detail=f"{definition.kind}: {definition.type_name}",
+                    documentation=definition.detail,
+                    insert_text=name
                 )
             )
 
-        return CompletionList(is_incomplete=False, items=completions)
+        items: List[CompletionItem] = []
+        starts: List[int] = []
+        for name in semantic_analyzer.sorted_names:
+            starts.append(len(items))
+            items.extend(by_name[name])
+        starts.append(len(items))
+        return items, starts
 
     async def on_hover(self, params: HoverParams) -> Optional[Hover]:
         """Handle hover request."""
         uri = params.text_document.uri
         position = params.position
 
-        if uri not in self.document_cache:
+        if uri not in self.workspace.documents:
             return None
 
         # Get semantic analyzer
@@ -236,20 +581,7 @@ class AetherScriptLanguageServer(LanguageServer):
         # Get word at position
         line = position.line
         character = position.character
-        text = self.document_cache[uri]
-        lines = text.split("\n")
-        current_line = lines[line] if line < len(lines) else ""
-
-        # Find word at position
-        word_start = character
-        while word_start > 0 and (current_line[word_start - 1].isalnum() or current_line[word_start - 1] == "_"):
-            word_start -= 1
-
-        word_end = character
-        while word_end < len(current_line) and (current_line[word_end].isalnum() or current_line[word_end] == "_"):
-            word_end += 1
-
-        word = current_line[word_start:word_end]
+        word_start, word_end, word = self._word_at(uri, line, character)
 
         if not word:
             return None
@@ -277,7 +609,7 @@ class AetherScriptLanguageServer(LanguageServer):
         uri = params.text_document.uri
         position = params.position
 
-        if uri not in self.document_cache:
+        if uri not in self.workspace.documents:
             return None
 
         # Get semantic analyzer
@@ -288,27 +620,13 @@ class AetherScriptLanguageServer(LanguageServer):
         # Get word at position
         line = position.line
         character = position.character
-        text = self.document_cache[uri]
-        lines = text.split("\n")
-        current_line = lines[line] if line < len(lines) else ""
-
-        # Find word at position
-        word_start = character
-        while word_start > 0 and (current_line[word_start - 1].isalnum() or current_line[word_start - 1] == "_"):
-            word_start -= 1
-
-        word_end = character
-        while word_end < len(current_line) and (current_line[word_end].isalnum() or current_line[word_end] == "_"):
-            word_end += 1
-
-        word = current_line[word_start:word_end]
+        word_start, word_end, word = self._word_at(uri, line, character)
 
         if not word:
             return None
 
         # Find definition
-        lsp_location = AetherLocation(line + 1, character + 1)
-        definition = semantic_analyzer.find_definition(word, lsp_location)
+        definition = semantic_analyzer.find_definition(word)
 
         if definition:
             return Location(
@@ -326,7 +644,7 @@ class AetherScriptLanguageServer(LanguageServer):
         uri = params.text_document.uri
         position = params.position
 
-        if uri not in self.document_cache:
+        if uri not in self.workspace.documents:
             return []
 
         # Get semantic analyzer
@@ -337,27 +655,13 @@ class AetherScriptLanguageServer(LanguageServer):
         # Get word at position
         line = position.line
         character = position.character
-        text = self.document_cache[uri]
-        lines = text.split("\n")
-        current_line = lines[line] if line < len(lines) else ""
-
-        # Find word at position
-        word_start = character
-        while word_start > 0 and (current_line[word_start - 1].isalnum() or current_line[word_start - 1] == "_"):
-            word_start -= 1
-
-        word_end = character
-        while word_end < len(current_line) and (current_line[word_end].isalnum() or current_line[word_end] == "_"):
-            word_end += 1
-
-        word = current_line[word_start:word_end]
+        word_start, word_end, word = self._word_at(uri, line, character)
 
         if not word:
             return []
 
         # Find definition
-        lsp_location = AetherLocation(line + 1, character + 1)
-        definition = semantic_analyzer.find_definition(word, lsp_location)
+        definition = semantic_analyzer.find_definition(word)
 
         if not definition:
             return []
@@ -384,7 +688,7 @@ class AetherScriptLanguageServer(LanguageServer):
         """Handle document symbol request."""
         uri = params.text_document.uri
 
-        if uri not in self.document_cache:
+        if uri not in self.workspace.documents:
             return []
 
         # Get semantic analyzer
@@ -392,180 +696,184 @@ class AetherScriptLanguageServer(LanguageServer):
         if not semantic_analyzer:
             return []
 
-        # Find symbols
-        symbols = []
-        for name, definitions in semantic_analyzer.definitions.items():
-            for definition in definitions:
-                kind = None
-                if definition.kind == "function":
-                    kind = SymbolKind.Function
-                elif definition.kind == "variable":
-                    kind = SymbolKind.Variable
-                elif definition.kind == "parameter":
-                    kind = SymbolKind.Variable
-                else:
-                    kind = SymbolKind.String
-
-                symbols.append(
-                    SymbolInformation(
-                        name=name,
-                        kind=kind,
-                        location=Location(
-                            uri=uri,
-                            range=Range(
-                                start=Position(line=definition.location.line - 1, character=definition.location.column - 1),
-                                end=Position(line=definition.location.line - 1, character=definition.location.column - 1 + len(name))
-                            )
-                        ),
-                        container_name=definition.kind
-                    )
-                )
-
-        return symbols
+        return self._document_symbols(uri)
 
     async def on_workspace_symbol(self, params: WorkspaceSymbolParams) -> List[SymbolInformation]:
         """Handle workspace symbol request."""
         query = params.query.lower()
 
         # Find symbols in all documents
-        symbols = []
-        for uri, semantic_analyzer in self.semantic_analyzers.items():
-            for name, definitions in semantic_analyzer.definitions.items():
-                if query and query not in name.lower():
-                    continue
-
-                for definition in definitions:
-                    kind = None
-                    if definition.kind == "function":
-                        kind = SymbolKind.Function
-                    elif definition.kind == "variable":
-                        kind = SymbolKind.Variable
-                    elif definition.kind == "parameter":
-                        kind = SymbolKind.Variable
-                    else:
-                        kind = SymbolKind.String
-
-                    symbols.append(
-                        SymbolInformation(
-                            name=name,
-                            kind=kind,
-                            location=Location(
-                                uri=uri,
-                                range=Range(
-                                    start=Position(line=definition.location.line - 1, character=definition.location.column - 1),
-                                    end=Position(line=definition.location.line - 1, character=definition.location.column - 1 + len(name))
-                                )
+        symbols: List[SymbolInformation] = []
+        for uri in self._ws_index:
+            document_symbols = self._document_symbols(uri)
+            symbols.extend(document_symbols[index] for index in self._match_workspace_symbols(uri, query))
+
+        return symbols
+
+    def _document_symbols(self, uri: str) -> List[SymbolInformation]:
+        """Get the symbol information of every definition in a document.
+
+        The models are built once per analysis with construct(), skipping
+        pydantic validation, and shared by all requests until the next one.
+        """
+        symbols = self._symbols.get(uri)
+        if symbols is None:
+            symbols = self._symbols[uri] = [
+                SymbolInformation.construct(
+                    name=name,
+                    kind=SYMBOL_KINDS.get(definition.kind, SymbolKind.String),
+                    location=Location.construct(
+                        uri=uri,
+                        range=Range.construct(
+                            start=Position.construct(
+                                line=definition.location.line - 1,
+                                character=definition.location.column - 1
                             ),
-                            container_name=definition.kind
+                            end=Position.construct(
+                                line=definition.location.line - 1,
+                                character=definition.location.column - 1 + len(name)
+                            )
                         )
+                    ),
+                    container_name=definition.kind
+                )
+                for _, name, definition in self._ws_index[uri]
+            ]
+        return symbols
+
+    def _match_workspace_symbols(self, uri: str, query: str) -> Iterator[int]:
+        """Find the index entries of a document whose name contains a lowercase query."""
+        entries = self._ws_index[uri]
+        if len(query) < 3:
+            for index, (lowered, _, _) in enumerate(entries):
+                if query in lowered:
+                    yield index
+            return
+
+        trigrams = self._ws_trigrams.get(uri)
+        if trigrams is None:
+            trigrams = self._ws_trigrams[uri] = {}
+            for index, (lowered, _, _) in enumerate(entries):
+                for start in range(len(lowered) - 2):
+                    postings = trigrams.setdefault(lowered[start:start + 3], [])
+                    if not postings or postings[-1] != index:
+                        postings.append(index)
+
+        # Only names containing every trigram of the query can contain it
+        candidates: Optional[Set[int]] = None
+        for start in range(len(query) - 2):
+            postings = trigrams.get(query[start:start + 3])
+            if postings is None:
+                return
+            candidates = set(postings) if candidates is None else candidates.intersection(postings)
+            if not candidates:
+                return
+
+        for index in sorted(candidates or ()):
+            if query in entries[index][0]:
+                yield index
+
+    async def _analyze_document(
+        self, uri: str, text: str, changed_offset: Optional[int] = None, update_cache: bool = False
+    ) -> None:
+        """Analyze a document and publish diagnostics.
+
+        If ``changed_offset`` is given, the document was edited from that
+        offset on, and only that part of it is parsed again. The type check
+        cache is only written if ``update_cache`` is set, which is done when
+        a document is opened or saved rather than on every edit.
+        """
+        version = self.doc_version.get(uri)
+
+        lock = self._analysis_locks.get(uri)
+        if lock is None:
+            lock = self._analysis_locks[uri] = asyncio.Lock()
+
+        async with lock:
+            # Text that was already analyzed only needs its diagnostics again
+            text_hash = hashlib.blake2b(text.encode(), digest_size=16).digest()
+            if self._analysis_hash.get(uri) == text_hash:
+                if update_cache and self.check_cache is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._exec, self.type_checkers[uri].store_in_cache, text
                     )
+                self._queue_diagnostics(uri, self._diagnostics[uri])
+                return
 
-        return symbols
+            logger.info("Analyzing document: %s", uri)
 
-    async def _analyze_document(self, uri: str, text: str) -> None:
-        """Analyze a document and publish diagnostics."""
-        logger.info(f"Analyzing document: {uri}")
+            # Analyze on a worker thread, so requests answered from the
+            # cached state of other documents are not held up meanwhile
+            parser, type_checker, semantic_analyzer, diagnostics = (
+                await asyncio.get_running_loop().run_in_executor(
+                    self._exec, self._analyze_sync, text, self.parsers.get(uri), changed_offset, update_cache
+                )
+            )
 
+            self.parsers[uri] = parser
+            self.type_checkers[uri] = type_checker
+            self.semantic_analyzers[uri] = semantic_analyzer
+            self._ws_index[uri] = [
+                (name.lower(), name, definition)
+                for name, definition in semantic_analyzer.iter_definitions()
+            ]
+            self._ws_trigrams.pop(uri, None)
+            self._definition_items.pop(uri, None)
+            self._symbols.pop(uri, None)
+
+            self._analysis_hash[uri] = text_hash
+            self._diagnostics[uri] = diagnostics
+
+        # Publish diagnostics, unless the document has changed meanwhile
+        if self.doc_version.get(uri) != version:
+            return
+        self._queue_diagnostics(uri, diagnostics)
+
+    def _analyze_sync(
+        self, text: str, previous_parser: Optional[Parser], changed_offset: Optional[int], update_cache: bool
+    ) -> Tuple[Parser, TypeChecker, SemanticAnalyzer, List[Diagnostic]]:
+        """Parse, type check and analyze a document, returning its diagnostics.
+
+        Runs on a worker thread and touches no server state other than the
+        type check cache.
+        """
         # Parse the document
-        parser = Parser(text)
-        ast = parser.parse()
-        self.parsers[uri] = parser
-
-        # Collect parse errors
-        parse_errors = parser.errors
+        if changed_offset is not None and previous_parser is not None:
+            parser, ast = reparse(previous_parser, text, changed_offset)
+        else:
+            parser = Parser(text)
+            ast = parser.parse()
 
         # Type check the document
-        type_checker = TypeChecker()
-        type_errors = type_checker.check(ast)
-        self.type_checkers[uri] = type_checker
+        type_checker = TypeChecker(cache=self.check_cache)
+        type_errors = type_checker.check(ast, source=text, update_cache=update_cache)
 
         # Semantic analysis
         semantic_analyzer = SemanticAnalyzer()
-        semantic_info = semantic_analyzer.analyze(ast)
-        self.semantic_analyzers[uri] = semantic_analyzer
-
-        # Collect semantic errors
-        semantic_errors = semantic_info.errors
+        semantic_info = semantic_analyzer.analyze(ast, size_hint=len(text) // 16)
 
         # Convert errors to diagnostics
-        diagnostics = []
-
-        # Add parse errors
-        for error in parse_errors:
-            diagnostics.append(
-                Diagnostic(
-                    range=Range(
-                        start=Position(line=error.token.line - 1, character=error.token.column - 1),
-                        end=Position(line=error.token.line - 1, character=error.token.column - 1 + len(error.token.value))
-                    ),
-                    message=error.message,
-                    severity=DiagnosticSeverity.Error,
-                    source="aetherscript-parser"
-                )
-            )
-
-        # Add type errors
-        for error in type_errors:
-            diagnostics.append(
-                Diagnostic(
-                    range=Range(
-                        start=Position(line=error.line - 1, character=error.column - 1),
-                        end=Position(line=error.line - 1, character=error.column)
-                    ),
-                    message=error.message,
-                    severity=DiagnosticSeverity.Error,
-                    source="aetherscript-type-checker"
-                )
-            )
-
-        # Add semantic errors
-        for error in semantic_errors:
-            # Parse the error message to extract line and column information
-            parts = error.split(" at ")
-            if len(parts) >= 2:
-                location_parts = parts[-1].split(":")
-                if len(location_parts) >= 2:
-                    try:
-                        line = int(location_parts[0])
-                        column = int(location_parts[1])
-
-                        diagnostics.append(
-                            Diagnostic(
-                                range=Range(
-                                    start=Position(line=line - 1, character=column - 1),
-                                    end=Position(line=line - 1, character=column)
-                                ),
-                                message=parts[0],
-                                severity=DiagnosticSeverity.Warning,
-                                source="aetherscript-semantic-analyzer"
-                            )
-                        )
-                    except ValueError:
-                        # Fallback to a generic location
-                        diagnostics.append(
-                            Diagnostic(
-                                range=Range(
-                                    start=Position(line=0, character=0),
-                                    end=Position(line=0, character=1)
-                                ),
-                                message=error,
-                                severity=DiagnosticSeverity.Warning,
-                                source="aetherscript-semantic-analyzer"
-                            )
-                        )
-            else:
-                # Fallback to a generic location
-                diagnostics.append(
-                    Diagnostic(
-                        range=Range(
-                            start=Position(line=0, character=0),
-                            end=Position(line=0, character=1)
-                        ),
-                        message=error,
-                        severity=DiagnosticSeverity.Warning,
-                        source="aetherscript-semantic-analyzer"
-                    )
-                )
-
-        # Publish diagnostics
-        self.publish_diagnostics(uri, diagnostics)
+        diagnostics = [
+            *_parse_diagnostics(parser.errors),
+            *_type_diagnostics(type_errors),
+            *_semantic_diagnostics(semantic_info.errors),
+        ]
+        return parser, type_checker, semantic_analyzer, diagnostics
+
+    def _queue_diagnostics(self, uri: str, diagnostics: List[Diagnostic]) -> None:
+        """Publish diagnostics along with any others queued in this loop iteration.
+
+        Documents analyzed one after another (say, on a save of several
+        files) have their diagnostics sent in one batch, and a document
+        analyzed twice in the meantime only has its latest ones sent.
+        """
+        self._diag_queue[uri] = diagnostics
+        if self._diag_flush is None:
+            self._diag_flush = asyncio.get_running_loop().call_soon(self._flush_diagnostics)
+
+    def _flush_diagnostics(self) -> None:
+        """Publish all queued diagnostics."""
+        self._diag_flush = None
+        queue, self._diag_queue = self._diag_queue, {}
+        for uri, diagnostics in queue.items():
+            self.publish_diagnostics(uri, diagnostics)
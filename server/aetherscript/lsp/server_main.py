@@ -23,6 +23,19 @@ def main():
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
         default="INFO"
     )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for the type check cache",
+        default=os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+            "aetherscript"
+        )
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Disable the type check cache",
+        action="store_true"
+    )
     args = parser.parse_args()
 
     # Configure logging
@@ -35,7 +48,7 @@ def main():
     )
 
     # Start the server
-    server = AetherScriptLanguageServer()
+    server = AetherScriptLanguageServer(cache_dir=None if args.no_cache else args.cache_dir)
     server.start_io()
 
 
@@ -1,30 +1,73 @@
 """Abstract Syntax Tree (AST) for AetherScript."""
 
-from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import List, Optional, Any, Dict, Union
+from dataclasses import dataclass, field
+from typing import List, Optional, Any, Callable, Dict, Union, Tuple, ClassVar, get_args, get_origin
 
+from aetherscript._compat import DATACLASS_SLOTS
 
-class Node(ABC):
+
+class Node:
     """Base class for all AST nodes."""
 
-    @abstractmethod
+    # Node classes are slotted dataclasses where supported, so the abstract
+    # bases must not give them a __dict__
+    __slots__ = ()
+
+    # Names of the fields holding a child node / a list of child nodes,
+    # worked out once per class from its annotations (see __init_subclass__)
+    _child_fields: ClassVar[Tuple[str, ...]] = ()
+    _child_list_fields: ClassVar[Tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+
+        annotations: Dict[str, Any] = {}
+        for klass in reversed(cls.__mro__):
+            annotations.update(getattr(klass, "__annotations__", {}))
+
+        child_fields = []
+        child_list_fields = []
+        for name, annotation in annotations.items():
+            if name.startswith("_"):
+                continue
+            if _is_node_type(annotation):
+                child_fields.append(name)
+            elif get_origin(annotation) is list and _is_node_type(get_args(annotation)[0]):
+                child_list_fields.append(name)
+
+        cls._child_fields = tuple(child_fields)
+        cls._child_list_fields = tuple(child_list_fields)
+
     def accept(self, visitor: 'ASTVisitor') -> Any:
         """Accept a visitor to process this node."""
-        pass
+        raise NotImplementedError
+
+
+def _is_node_type(annotation: Any) -> bool:
+    """Check whether a field annotation holds a (possibly optional) AST node."""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return bool(args) and all(_is_node_type(arg) for arg in args)
+    return isinstance(annotation, type) and issubclass(annotation, Node)
 
 
 class Expression(Node):
     """Base class for all expressions."""
-    pass
+
+    __slots__ = ()
+
+    # Every expression records where it starts in the source
+    line: int
+    column: int
 
 
 class Statement(Node):
     """Base class for all statements."""
-    pass
 
+    __slots__ = ()
 
-@dataclass
+
+@dataclass(**DATACLASS_SLOTS)
 class Program(Node):
     """Represents a complete program."""
 
@@ -34,7 +77,7 @@ class Program(Node):
         return visitor.visit_program(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Identifier(Expression):
     """Represents an identifier."""
 
@@ -46,7 +89,7 @@ class Identifier(Expression):
         return visitor.visit_identifier(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Literal(Expression):
     """Base class for literal values."""
 
@@ -55,7 +98,7 @@ class Literal(Expression):
     column: int
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class IntegerLiteral(Literal):
     """Represents an integer literal."""
 
@@ -63,7 +106,7 @@ class IntegerLiteral(Literal):
         return visitor.visit_integer_literal(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class FloatLiteral(Literal):
     """Represents a float literal."""
 
@@ -71,7 +114,7 @@ class FloatLiteral(Literal):
         return visitor.visit_float_literal(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class StringLiteral(Literal):
     """Represents a string literal."""
 
@@ -79,7 +122,7 @@ class StringLiteral(Literal):
         return visitor.visit_string_literal(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BooleanLiteral(Literal):
     """Represents a boolean literal."""
 
@@ -87,7 +130,7 @@ class BooleanLiteral(Literal):
         return visitor.visit_boolean_literal(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BinaryExpression(Expression):
     """Represents a binary operation."""
 
@@ -101,7 +144,7 @@ class BinaryExpression(Expression):
         return visitor.visit_binary_expression(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class UnaryExpression(Expression):
     """Represents a unary operation."""
 
@@ -114,7 +157,7 @@ class UnaryExpression(Expression):
         return visitor.visit_unary_expression(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class VariableDeclaration(Statement):
     """Represents a variable declaration."""
 
@@ -128,7 +171,7 @@ class VariableDeclaration(Statement):
         return visitor.visit_variable_declaration(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Parameter(Node):
     """Represents a function parameter."""
 
@@ -139,7 +182,7 @@ class Parameter(Node):
         return visitor.visit_parameter(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class FunctionDeclaration(Statement):
     """Represents a function declaration."""
 
@@ -149,12 +192,14 @@ class FunctionDeclaration(Statement):
     body: List[Statement]
     line: int
     column: int
+    # Formatted signature, filled in by the analyzer the first time it is needed
+    _sig_cache: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def accept(self, visitor: 'ASTVisitor') -> Any:
         return visitor.visit_function_declaration(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ReturnStatement(Statement):
     """Represents a return statement."""
 
@@ -166,19 +211,25 @@ class ReturnStatement(Statement):
         return visitor.visit_return_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class BlockStatement(Statement):
     """Represents a block of statements."""
 
     statements: List[Statement]
     line: int
     column: int
+    # Whether any statement of the block declares a name in the block's own
+    # scope (see declares_in_scope), in which case it needs a scope of its own
+    declares_vars: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.declares_vars = any(declares_in_scope(statement) for statement in self.statements)
 
     def accept(self, visitor: 'ASTVisitor') -> Any:
         return visitor.visit_block_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class IfStatement(Statement):
     """Represents an if statement."""
 
@@ -192,7 +243,7 @@ class IfStatement(Statement):
         return visitor.visit_if_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class WhileStatement(Statement):
     """Represents a while statement."""
 
@@ -205,7 +256,7 @@ class WhileStatement(Statement):
         return visitor.visit_while_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ForStatement(Statement):
     """Represents a for statement."""
 
@@ -215,12 +266,20 @@ class ForStatement(Statement):
     body: Statement
     line: int
     column: int
+    # Whether the initializer or the body declares a name in the loop's own
+    # scope, in which case it needs a scope of its own
+    declares_vars: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.declares_vars = (
+            isinstance(self.initializer, VariableDeclaration) or declares_in_scope(self.body)
+        )
 
     def accept(self, visitor: 'ASTVisitor') -> Any:
         return visitor.visit_for_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ExpressionStatement(Statement):
     """Represents an expression used as a statement."""
 
@@ -232,7 +291,7 @@ class ExpressionStatement(Statement):
         return visitor.visit_expression_statement(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class CallExpression(Expression):
     """Represents a function call."""
 
@@ -245,7 +304,7 @@ class CallExpression(Expression):
         return visitor.visit_call_expression(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class AssignmentExpression(Expression):
     """Represents an assignment."""
 
@@ -258,7 +317,7 @@ class AssignmentExpression(Expression):
         return visitor.visit_assignment_expression(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class ArrayLiteral(Expression):
     """Represents an array literal."""
 
@@ -270,7 +329,7 @@ class ArrayLiteral(Expression):
         return visitor.visit_array_literal(self)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class IndexExpression(Expression):
     """Represents an array index operation."""
 
@@ -283,89 +342,133 @@ class IndexExpression(Expression):
         return visitor.visit_index_expression(self)
 
 
-class ASTVisitor(ABC):
+class ASTVisitor:
     """Base visitor class for traversing the AST."""
 
-    @abstractmethod
+    # Node class -> unbound visitor function, resolved against each subclass
+    # so that overrides are honoured
+    _visitors: ClassVar[Dict[type, Callable[..., Any]]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._visitors = {
+            node_type: getattr(cls, name)
+            for node_type, name in VISITOR_METHOD_NAMES.items()
+        }
+
+    def visit(self, node: Node) -> Any:
+        """Visit a node with the method for its class.
+
+        Dispatches on type(node) through a table, which is cheaper than
+        node.accept(self) calling back into the visitor.
+        """
+        return self._visitors[type(node)](self, node)
+
     def visit_program(self, node: Program) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_identifier(self, node: Identifier) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_integer_literal(self, node: IntegerLiteral) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_float_literal(self, node: FloatLiteral) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_string_literal(self, node: StringLiteral) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_boolean_literal(self, node: BooleanLiteral) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_binary_expression(self, node: BinaryExpression) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_unary_expression(self, node: UnaryExpression) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_variable_declaration(self, node: VariableDeclaration) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_parameter(self, node: Parameter) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_function_declaration(self, node: FunctionDeclaration) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_return_statement(self, node: ReturnStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_block_statement(self, node: BlockStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_if_statement(self, node: IfStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_while_statement(self, node: WhileStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_for_statement(self, node: ForStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_expression_statement(self, node: ExpressionStatement) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_call_expression(self, node: CallExpression) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_assignment_expression(self, node: AssignmentExpression) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_array_literal(self, node: ArrayLiteral) -> Any:
-        pass
+        raise NotImplementedError
 
-    @abstractmethod
     def visit_index_expression(self, node: IndexExpression) -> Any:
-        pass
+        raise NotImplementedError
+
+
+def declares_in_scope(statement: Statement) -> bool:
+    """Check whether a statement declares a name in the scope it runs in.
+
+    Besides declarations themselves, that is the case for if and while
+    statements whose brace-less branches or bodies do. Blocks and for loops
+    that declare anything get scopes of their own, so nothing they declare
+    reaches the enclosing scope.
+    """
+    if isinstance(statement, (VariableDeclaration, FunctionDeclaration)):
+        return True
+    if isinstance(statement, IfStatement):
+        return declares_in_scope(statement.then_branch) or (
+            statement.else_branch is not None and declares_in_scope(statement.else_branch)
+        )
+    if isinstance(statement, WhileStatement):
+        return declares_in_scope(statement.body)
+    return False
+
+
+# ASTVisitor method that handles each node class, for visitors that dispatch
+# on type(node) through a table instead of calling accept()
+VISITOR_METHOD_NAMES: Dict[type, str] = {
+    Program: "visit_program",
+    Identifier: "visit_identifier",
+    IntegerLiteral: "visit_integer_literal",
+    FloatLiteral: "visit_float_literal",
+    StringLiteral: "visit_string_literal",
+    BooleanLiteral: "visit_boolean_literal",
+    BinaryExpression: "visit_binary_expression",
+    UnaryExpression: "visit_unary_expression",
+    VariableDeclaration: "visit_variable_declaration",
+    Parameter: "visit_parameter",
+    FunctionDeclaration: "visit_function_declaration",
+    ReturnStatement: "visit_return_statement",
+    BlockStatement: "visit_block_statement",
+    IfStatement: "visit_if_statement",
+    WhileStatement: "visit_while_statement",
+    ForStatement: "visit_for_statement",
+    ExpressionStatement: "visit_expression_statement",
+    CallExpression: "visit_call_expression",
+    AssignmentExpression: "visit_assignment_expression",
+    ArrayLiteral: "visit_array_literal",
+    IndexExpression: "visit_index_expression",
+}
@@ -0,0 +1,92 @@
+"""Incremental re-parsing of edited AetherScript sources."""
+
+from typing import List, Tuple
+
+from aetherscript.parser.ast import Program
+from aetherscript.parser.lexer import Lexer, Token
+from aetherscript.parser.parser import Parser
+
+
+def offset_at(source: str, line: int, character: int) -> int:
+    """Get the offset in ``source`` of a zero-based LSP line and character position.
+
+    LSP counts characters in UTF-16 code units, so a character outside the
+    Basic Multilingual Plane counts as two. Positions past the end of a
+    line are taken to be its end.
+    """
+    offset = 0
+    for _ in range(line):
+        newline = source.find("\n", offset)
+        if newline < 0:
+            return len(source)
+        offset = newline + 1
+
+    line_end = source.find("\n", offset)
+    if line_end < 0:
+        line_end = len(source)
+    end = min(offset + character, line_end)
+    if source[offset:end].isascii():
+        # One code unit per character
+        return end
+
+    units = 0
+    while offset < line_end and units < character:
+        units += 2 if ord(source[offset]) > 0xFFFF else 1
+        offset += 1
+    return offset
+
+
+def reparse(previous: Parser, source: str, changed_offset: int) -> Tuple[Parser, Program]:
+    """Parse an edited source, reusing the start of a previous parse.
+
+    ``previous`` must have parsed the source as it was before the edit, and
+    the edit must leave everything before ``changed_offset`` as it was. Top-
+    level statements the parser finished before that offset are kept as they
+    are, and only the rest of the source is lexed and parsed again.
+    """
+    tokens = previous.tokens
+    boundaries = previous.boundaries
+
+    # Offsets of the lines before the change, which are the same in both
+    # versions of the source
+    line_starts: List[int] = [0]
+    newline = source.find("\n", 0, changed_offset)
+    while newline >= 0:
+        line_starts.append(newline + 1)
+        newline = source.find("\n", newline + 1, changed_offset)
+
+    def before_change(token: Token) -> bool:
+        if token.line > len(line_starts):
+            return False
+        return line_starts[token.line - 1] + token.column - 1 < changed_offset
+
+    # A statement can be kept if the token after it (which the parser looked
+    # at to decide where it ends) lies wholly before the change, which holds
+    # when the token after that one starts before the change
+    low, high = 0, len(boundaries)
+    while low < high:
+        middle = (low + high) // 2
+        end = boundaries[middle][0]
+        if end + 1 < len(tokens) and before_change(tokens[end + 1]):
+            low = middle + 1
+        else:
+            high = middle
+    keep = low
+
+    if keep == 0:
+        parser = Parser(source)
+        return parser, parser.parse()
+
+    # Lex again from the first token after the kept statements
+    end, statement_count, error_count = boundaries[keep - 1]
+    restart = tokens[end]
+    lexer = Lexer(
+        source, line_starts[restart.line - 1] + restart.column - 1, restart.line, restart.column
+    )
+
+    parser = Parser(source, tokens=tokens[:end] + lexer.tokenize())
+    parser.current = end
+    parser.statements = previous.statements[:statement_count]
+    parser.errors = previous.errors[:error_count]
+    parser.boundaries = boundaries[:keep]
+    return parser, parser.parse()
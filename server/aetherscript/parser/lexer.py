@@ -1,12 +1,19 @@
 """Lexer for AetherScript."""
 
-from enum import Enum, auto
+import re
+import sys
+from enum import IntEnum, auto
 from dataclasses import dataclass
 from typing import List, Optional
 
+from aetherscript._compat import DATACLASS_SLOTS
 
-class TokenType(Enum):
-    """Token types for AetherScript."""
+
+class TokenType(IntEnum):
+    """Token types for AetherScript.
+
+    An IntEnum, so the parser's many token type comparisons are int compares.
+    """
 
     # Special tokens
     EOF = auto()
@@ -78,7 +85,7 @@ class TokenType(Enum):
     COLON = auto()
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Token:
     """Token representation."""
 
@@ -88,19 +95,77 @@ class Token:
     column: int
 
     def __repr__(self) -> str:
-        return f"Token({self.type}, '{self.value}', {self.line}:{self.column})"
+        return f"Token(TokenType.{self.type.name}, '{self.value}', {self.line}:{self.column})"
+
+
+# Operator and delimiter tokens by their text, which is interned so the
+# lexer can give every token of an operator the same string
+OPERATORS = {sys.intern(text): token_type for text, token_type in {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.MULTIPLY,
+    '/': TokenType.DIVIDE,
+    '%': TokenType.MODULO,
+    '=': TokenType.ASSIGN,
+    '==': TokenType.EQUALS,
+    '!=': TokenType.NOT_EQUALS,
+    '<': TokenType.LESS_THAN,
+    '>': TokenType.GREATER_THAN,
+    '<=': TokenType.LESS_EQUAL,
+    '>=': TokenType.GREATER_EQUAL,
+    '&&': TokenType.AND,
+    '||': TokenType.OR,
+    '!': TokenType.NOT,
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '{': TokenType.LBRACE,
+    '}': TokenType.RBRACE,
+    '[': TokenType.LBRACKET,
+    ']': TokenType.RBRACKET,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    ';': TokenType.SEMICOLON,
+    ':': TokenType.COLON,
+}.items()}
+
+# Character each escape sequence in a string stands for, by the character
+# after the backslash
+ESCAPES = {
+    'n': '\n',
+    't': '\t',
+    'r': '\r',
+    '\\': '\\',
+    '"': '"',
+    "'": "'",
+}
+
+# The tokens tokenize() matches with a regex. Names and numbers are ASCII
+# only and strings have no escapes or newlines; anything else is left to
+# the character-by-character methods.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>[0-9]+(?:\.[0-9]*)?)
+  | (?P<string>"[^"\\\n]*"|'[^'\\\n]*')
+  | (?P<operator>==|!=|<=|>=|&&|\|\||[-+*/%=!<>(){}\[\],.;:])
+""", re.VERBOSE | re.DOTALL)
 
 
 class Lexer:
     """Lexer for AetherScript."""
 
-    def __init__(self, source: str):
-        """Initialize lexer with source code."""
+    def __init__(self, source: str, position: int = 0, line: int = 1, column: int = 1):
+        """Initialize lexer with source code.
+
+        Lexing starts at ``position``, which is at the given line and column,
+        so the rest of a source can be lexed again from a token boundary.
+        """
         self.source = source
-        self.position = 0
-        self.line = 1
-        self.column = 1
-        self.current_char = self.source[0] if self.source else None
+        self.position = position
+        self.line = line
+        self.column = column
+        self.current_char = self.source[position] if position < len(self.source) else None
 
         # Keywords mapping
         self.keywords = {
@@ -150,22 +215,31 @@ class Lexer:
             self.advance()
 
     def skip_comment(self) -> None:
-        """Skip comments."""
+        """Skip comments.
+
+        The end of a comment is found with a single string search rather
+        than by advancing one character at a time.
+        """
         if self.current_char == '/' and self.peek() == '/':
-            # Line comment
-            while self.current_char is not None and self.current_char != '\n':
-                self.advance()
+            # Line comment: up to, not including, the newline
+            end = self.source.find('\n', self.position)
+            self.jump(end if end >= 0 else len(self.source))
         elif self.current_char == '/' and self.peek() == '*':
-            # Block comment
-            self.advance()  # Skip '/'
-            self.advance()  # Skip '*'
-
-            while self.current_char is not None:
-                if self.current_char == '*' and self.peek() == '/':
-                    self.advance()  # Skip '*'
-                    self.advance()  # Skip '/'
-                    break
-                self.advance()
+            # Block comment: past the closing '*/', or to the end if unclosed
+            end = self.source.find('*/', self.position + 2)
+            self.jump(end + 2 if end >= 0 else len(self.source))
+
+    def jump(self, position: int) -> None:
+        """Move ahead to ``position``, keeping the line and column in step."""
+        newlines = self.source.count('\n', self.position, position)
+        if newlines:
+            self.line += newlines
+            self.column = position - self.source.rfind('\n', self.position, position)
+        else:
+            self.column += position - self.position
+
+        self.position = position
+        self.current_char = self.source[position] if position < len(self.source) else None
 
     def peek(self) -> Optional[str]:
         """Look at the next character without advancing."""
@@ -173,133 +247,112 @@ class Lexer:
         return self.source[peek_pos] if peek_pos < len(self.source) else None
 
     def tokenize(self) -> List[Token]:
-        """Tokenize the source code."""
-        tokens = []
+        """Tokenize the source code.
+
+        Tokens are matched by iterating over TOKEN_PATTERN. Where it leaves
+        a token out, such as a name with non-ASCII characters or a string
+        with escapes, that token is lexed by identifier(), number() or
+        string(), and matching resumes after it.
+        """
+        tokens: List[Token] = []
+        source = self.source
+        length = len(source)
+        # Locals for the names used on every token
+        append = tokens.append
+        intern = sys.intern
+        keyword = self.keywords.get
+        identifier = TokenType.IDENTIFIER
+
+        position = self.position
+        line = self.line
+        # Offset of the first character of the current line
+        line_start = position - self.column + 1
+
+        while True:
+            for found in TOKEN_PATTERN.finditer(source, position):
+                if found.start() != position:
+                    # The pattern skipped over something
+                    break
+                kind = found.lastgroup
+                end = found.end()
+
+                if kind == "space" or kind == "comment":
+                    newlines = source.count('\n', position, end)
+                    if newlines:
+                        line += newlines
+                        line_start = source.rfind('\n', position, end) + 1
+                elif kind == "operator":
+                    # Interning gives back the OPERATORS key itself
+                    value = intern(found.group())
+                    append(Token(OPERATORS[value], value, line, position - line_start + 1))
+                elif end < length and source[end] > '\x7f':
+                    # A name or number that may run on into non-ASCII
+                    # letters or digits
+                    break
+                elif kind == "name":
+                    # Intern the name so symbol tables compare it by identity
+                    value = intern(found.group())
+                    append(Token(keyword(value, identifier), value, line, position - line_start + 1))
+                elif kind == "number":
+                    value = found.group()
+                    if '.' not in value:
+                        append(Token(TokenType.INTEGER, value, line, position - line_start + 1))
+                    else:
+                        # Handle case like "123." which should be "123.0"
+                        if value.endswith('.'):
+                            value += '0'
+                        append(Token(TokenType.FLOAT, value, line, position - line_start + 1))
+                else:
+                    append(Token(TokenType.STRING, source[position + 1:end - 1], line, position - line_start + 1))
+
+                position = end
 
-        while self.current_char is not None:
-            if self.current_char.isspace():
-                self.skip_whitespace()
-                continue
+            if position >= length:
+                break
 
-            if self.current_char == '/' and (self.peek() == '/' or self.peek() == '*'):
-                self.skip_comment()
-                continue
+            # Lex the token here a character at a time
+            self.position = position
+            self.line = line
+            self.column = position - line_start + 1
+            self.current_char = source[position]
 
-            # Identify tokens
             if self.current_char.isalpha() or self.current_char == '_':
-                tokens.append(self.identifier())
-            elif self.current_char.isdigit():
-                tokens.append(self.number())
+                append(self.identifier())
+            elif self.current_char.isdecimal():
+                append(self.number())
             elif self.current_char == '"' or self.current_char == "'":
-                tokens.append(self.string())
-            elif self.current_char == '+':
-                tokens.append(Token(TokenType.PLUS, '+', self.line, self.column))
-                self.advance()
-            elif self.current_char == '-':
-                tokens.append(Token(TokenType.MINUS, '-', self.line, self.column))
-                self.advance()
-            elif self.current_char == '*':
-                tokens.append(Token(TokenType.MULTIPLY, '*', self.line, self.column))
-                self.advance()
-            elif self.current_char == '/':
-                tokens.append(Token(TokenType.DIVIDE, '/', self.line, self.column))
-                self.advance()
-            elif self.current_char == '%':
-                tokens.append(Token(TokenType.MODULO, '%', self.line, self.column))
-                self.advance()
-            elif self.current_char == '=':
-                if self.peek() == '=':
-                    token = Token(TokenType.EQUALS, '==', self.line, self.column)
-                    self.advance()
-                    self.advance()
-                else:
-                    token = Token(TokenType.ASSIGN, '=', self.line, self.column)
-                    self.advance()
-                tokens.append(token)
-            elif self.current_char == '!':
-                if self.peek() == '=':
-                    token = Token(TokenType.NOT_EQUALS, '!=', self.line, self.column)
-                    self.advance()
-                    self.advance()
-                else:
-                    token = Token(TokenType.NOT, '!', self.line, self.column)
-                    self.advance()
-                tokens.append(token)
-            elif self.current_char == '<':
-                if self.peek() == '=':
-                    token = Token(TokenType.LESS_EQUAL, '<=', self.line, self.column)
-                    self.advance()
-                    self.advance()
-                else:
-                    token = Token(TokenType.LESS_THAN, '<', self.line, self.column)
-                    self.advance()
-                tokens.append(token)
-            elif self.current_char == '>':
-                if self.peek() == '=':
-                    token = Token(TokenType.GREATER_EQUAL, '>=', self.line, self.column)
-                    self.advance()
-                    self.advance()
-                else:
-                    token = Token(TokenType.GREATER_THAN, '>', self.line, self.column)
-                    self.advance()
-                tokens.append(token)
-            elif self.current_char == '&' and self.peek() == '&':
-                tokens.append(Token(TokenType.AND, '&&', self.line, self.column))
-                self.advance()
-                self.advance()
-            elif self.current_char == '|' and self.peek() == '|':
-                tokens.append(Token(TokenType.OR, '||', self.line, self.column))
-                self.advance()
-                self.advance()
-            elif self.current_char == '(':
-                tokens.append(Token(TokenType.LPAREN, '(', self.line, self.column))
-                self.advance()
-            elif self.current_char == ')':
-                tokens.append(Token(TokenType.RPAREN, ')', self.line, self.column))
-                self.advance()
-            elif self.current_char == '{':
-                tokens.append(Token(TokenType.LBRACE, '{', self.line, self.column))
-                self.advance()
-            elif self.current_char == '}':
-                tokens.append(Token(TokenType.RBRACE, '}', self.line, self.column))
-                self.advance()
-            elif self.current_char == '[':
-                tokens.append(Token(TokenType.LBRACKET, '[', self.line, self.column))
-                self.advance()
-            elif self.current_char == ']':
-                tokens.append(Token(TokenType.RBRACKET, ']', self.line, self.column))
-                self.advance()
-            elif self.current_char == ',':
-                tokens.append(Token(TokenType.COMMA, ',', self.line, self.column))
-                self.advance()
-            elif self.current_char == '.':
-                tokens.append(Token(TokenType.DOT, '.', self.line, self.column))
-                self.advance()
-            elif self.current_char == ';':
-                tokens.append(Token(TokenType.SEMICOLON, ';', self.line, self.column))
-                self.advance()
-            elif self.current_char == ':':
-                tokens.append(Token(TokenType.COLON, ':', self.line, self.column))
-                self.advance()
+                append(self.string())
             else:
                 # Unrecognized character
-                tokens.append(Token(TokenType.ERROR, self.current_char, self.line, self.column))
+                append(Token(TokenType.ERROR, self.current_char, self.line, self.column))
                 self.advance()
 
+            position = self.position
+            if self.line != line:
+                line = self.line
+                line_start = position - self.column + 1
+
+        self.position = position
+        self.line = line
+        self.column = position - line_start + 1
+        self.current_char = None
+
         # Add EOF token
-        tokens.append(Token(TokenType.EOF, '', self.line, self.column))
+        append(Token(TokenType.EOF, '', self.line, self.column))
 
         return tokens
 
     def identifier(self) -> Token:
         """Process identifiers and keywords."""
         line, column = self.line, self.column
-        result = ""
+        start = self.position
 
         while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-            result += self.current_char
             self.advance()
 
+        # Intern the name so symbol tables compare it by identity
+        result = sys.intern(self.source[start:self.position])
+
         # Check if the identifier is a keyword
         token_type = self.keywords.get(result, TokenType.IDENTIFIER)
 
@@ -308,19 +361,20 @@ class Lexer:
     def number(self) -> Token:
         """Process numeric literals."""
         line, column = self.line, self.column
-        result = ""
+        start = self.position
         is_float = False
 
-        while self.current_char is not None and (self.current_char.isdigit() or self.current_char == '.'):
+        while self.current_char is not None and (self.current_char.isdecimal() or self.current_char == '.'):
             if self.current_char == '.':
                 # Cannot have more than one decimal point
                 if is_float:
                     break
                 is_float = True
 
-            result += self.current_char
             self.advance()
 
+        result = self.source[start:self.position]
+
         # Handle case like "123." which should be "123.0"
         if result.endswith('.'):
             result += '0'
@@ -332,36 +386,39 @@ class Lexer:
     def string(self) -> Token:
         """Process string literals."""
         line, column = self.line, self.column
-        quote = self.current_char  # Save the quote character (' or ")
+        source = self.source
+        quote = source[self.position]  # Save the quote character (' or ")
+        start = self.position + 1
+
+        # Without escape sequences, the string is the text up to the quote
+        end = source.find(quote, start)
+        stop = end if end >= 0 else len(source)
+        if source.find('\\', start, stop) < 0:
+            if end < 0:
+                # Unterminated string
+                self.jump(stop)
+                return Token(TokenType.ERROR, source[start:stop], line, column)
+            self.jump(end + 1)
+            return Token(TokenType.STRING, source[start:end], line, column)
+
         self.advance()  # Skip the opening quote
 
-        result = ""
+        result = []
 
         while self.current_char is not None and self.current_char != quote:
             # Handle escape sequences
             if self.current_char == '\\' and self.peek() is not None:
                 self.advance()  # Skip backslash
-
-                # Process escape sequence
-                escape_map = {
-                    'n': '\n',
-                    't': '\t',
-                    'r': '\r',
-                    '\\': '\\',
-                    '"': '"',
-                    "'": "'"
-                }
-
-                result += escape_map.get(self.current_char, self.current_char)
+                result.append(ESCAPES.get(self.current_char, self.current_char))
             else:
-                result += self.current_char
+                result.append(self.current_char)
 
             self.advance()
 
         if self.current_char is None:
             # Unterminated string
-            return Token(TokenType.ERROR, result, line, column)
+            return Token(TokenType.ERROR, ''.join(result), line, column)
 
         self.advance()  # Skip the closing quote
 
-        return Token(TokenType.STRING, result, line, column)
+        return Token(TokenType.STRING, ''.join(result), line, column)
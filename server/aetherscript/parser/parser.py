@@ -1,6 +1,6 @@
 """Parser for AetherScript."""
 
-from typing import List, Optional, Dict, Callable, Any, Union
+from typing import List, Optional, Dict, Callable, Any, Tuple, Union
 
 from aetherscript.parser.lexer import Lexer, Token, TokenType
 from aetherscript.parser.ast import (
@@ -14,6 +14,17 @@ from aetherscript.parser.ast import (
 )
 
 
+# Token types that start a statement, where error recovery resumes parsing
+STATEMENT_STARTS = frozenset({
+    TokenType.FUNCTION,
+    TokenType.SPELL,
+    TokenType.IF,
+    TokenType.WHILE,
+    TokenType.FOR,
+    TokenType.RETURN
+})
+
+
 class ParseError(Exception):
     """Exception raised when a parsing error occurs."""
 
@@ -26,13 +37,24 @@ class ParseError(Exception):
 class Parser:
     """Parser for AetherScript."""
 
-    def __init__(self, source: str):
-        """Initialize the parser with source code."""
+    def __init__(self, source: str, tokens: Optional[List[Token]] = None):
+        """Initialize the parser with source code, or its already lexed tokens."""
         self.lexer = Lexer(source)
-        self.tokens = self.lexer.tokenize()
+        self.tokens = tokens if tokens is not None else self.lexer.tokenize()
         self.current = 0
+        self.statements: List[Statement] = []
         self.errors: List[ParseError] = []
 
+        # The error that ended the statement being parsed. Parse methods
+        # record it with error() and return None rather than raising, so a
+        # bad statement costs no exception unwinding or traceback, and the
+        # stored errors keep no parser frames alive
+        self._panic: Optional[ParseError] = None
+
+        # (token index, statement count, error count) after each top-level
+        # statement, so a re-parse after an edit can reuse the ones before it
+        self.boundaries: List[Tuple[int, int, int]] = []
+
         # Initialize operator precedence
         self.precedence = {
             TokenType.EQUALS: 1,         # ==
@@ -51,44 +73,86 @@ class Parser:
             TokenType.DOT: 6,            # .
         }
 
+        # The binary operators among them; the others are postfix
+        self.binary_precedence: Dict[TokenType, int] = {
+            token_type: level
+            for token_type, level in self.precedence.items()
+            if token_type not in (TokenType.LPAREN, TokenType.LBRACKET, TokenType.DOT)
+        }
+
     def parse(self) -> Program:
         """Parse the source code and return an AST."""
-        statements: List[Statement] = []
+        statements = self.statements
 
         while not self.is_at_end():
-            try:
-                statements.append(self.declaration())
-            except ParseError as error:
-                self.errors.append(error)
+            statement = self.declaration()
+            error = self._panic
+            if error is None and statement is not None:
+                statements.append(statement)
+            else:
+                if error is not None:
+                    self.errors.append(error)
+                self._panic = None
                 self.synchronize()
+            self.boundaries.append((self.current, len(statements), len(self.errors)))
 
         return Program(statements)
 
-    def declaration(self) -> Statement:
+    def declaration(self) -> Optional[Statement]:
         """Parse a declaration statement."""
         # This would be implemented with the specific AetherScript syntax
         # Placeholder for demonstration
         return self.statement()
 
-    def statement(self) -> Statement:
+    def statement(self) -> Optional[Statement]:
         """Parse a statement."""
         # This would be implemented with the specific AetherScript syntax
         # Placeholder for demonstration
         return self.expression_statement()
 
-    def expression_statement(self) -> Statement:
+    def expression_statement(self) -> Optional[Statement]:
         """Parse an expression statement."""
         expr = self.expression()
-        self.consume(TokenType.SEMICOLON, "Expected ';' after expression.")
+        if expr is None or self.consume(TokenType.SEMICOLON, "Expected ';' after expression.") is None:
+            return None
         return ExpressionStatement(expr, expr.line, expr.column)
 
-    def expression(self) -> Expression:
-        """Parse an expression."""
-        # This would be implemented with the specific AetherScript syntax
-        # Placeholder for demonstration
-        return self.primary()
+    def expression(self) -> Optional[Expression]:
+        """Parse an expression.
+
+        Binary operators are parsed by precedence climbing, all of them left
+        associative. Operators still waiting for their right operand are kept
+        on an explicit stack instead of a recursive call per precedence level.
+        """
+        precedence = self.binary_precedence
+        # (left operand, operator, operator precedence), innermost last
+        pending: List[Tuple[Expression, Token, int]] = []
+        operand = self.primary()
+        if operand is None:
+            return None
+
+        while True:
+            operator = self.peek()
+            level = precedence.get(operator.type, 0)
+
+            # Operators binding at least as tightly as this one take their
+            # right operands first
+            while pending and pending[-1][2] >= level:
+                left, left_operator, _ = pending.pop()
+                operand = BinaryExpression(
+                    left, left_operator.value, operand, left_operator.line, left_operator.column
+                )
+
+            if level == 0:
+                return operand
 
-    def primary(self) -> Expression:
+            self.advance()
+            pending.append((operand, operator, level))
+            operand = self.primary()
+            if operand is None:
+                return None
+
+    def primary(self) -> Optional[Expression]:
         """Parse a primary expression."""
         token = self.peek()
 
@@ -107,12 +171,14 @@ class Parser:
         elif token.type == TokenType.LPAREN:
             self.advance()
             expr = self.expression()
-            self.consume(TokenType.RPAREN, "Expected ')' after expression.")
+            if expr is None or self.consume(TokenType.RPAREN, "Expected ')' after expression.") is None:
+                return None
             return expr
 
         # Error case
         self.advance()
-        raise ParseError(token, f"Unexpected token: {token.value}")
+        self.error(token, f"Unexpected token: {token.value}")
+        return None
 
     # Helper methods
 
@@ -130,29 +196,41 @@ class Parser:
 
     def advance(self) -> Token:
         """Consume the current token and return it."""
-        if not self.is_at_end():
-            self.current += 1
-        return self.previous()
-
-    def consume(self, type: TokenType, message: str) -> Token:
-        """Consume a token of the given type or raise an error."""
+        current = self.current
+        tokens = self.tokens
+        if tokens[current].type != TokenType.EOF:
+            self.current = current + 1
+            return tokens[current]
+        return tokens[current - 1]
+
+    def consume(self, type: TokenType, message: str) -> Optional[Token]:
+        """Consume a token of the given type, or record an error and return None."""
         if self.check(type):
             return self.advance()
 
-        raise ParseError(self.peek(), message)
+        self.error(self.peek(), message)
+        return None
+
+    def error(self, token: Token, message: str) -> None:
+        """Record the error that ends the current statement.
+
+        The caller then returns None, as do the parse methods above it, up to
+        parse(), which adds the error to the list and resynchronizes.
+        """
+        self._panic = ParseError(token, message)
 
     def check(self, type: TokenType) -> bool:
         """Check if the current token is of the given type."""
-        if self.is_at_end():
-            return False
-        return self.peek().type == type
+        # Inlines is_at_end() and peek(), as this runs for nearly every token
+        token_type = self.tokens[self.current].type
+        return token_type == type and token_type != TokenType.EOF
 
     def match(self, *types: TokenType) -> bool:
         """Check if the current token matches any of the given types and advance if so."""
-        for type in types:
-            if self.check(type):
-                self.advance()
-                return True
+        token_type = self.tokens[self.current].type
+        if token_type in types and token_type != TokenType.EOF:
+            self.current += 1
+            return True
 
         return False
 
@@ -164,14 +242,7 @@ class Parser:
             if self.previous().type == TokenType.SEMICOLON:
                 return
 
-            if self.peek().type in (
-                TokenType.FUNCTION,
-                TokenType.SPELL,
-                TokenType.IF,
-                TokenType.WHILE,
-                TokenType.FOR,
-                TokenType.RETURN
-            ):
+            if self.peek().type in STATEMENT_STARTS:
                 return
 
             self.advance()
@@ -12,6 +12,16 @@ with open("requirements.txt", "r", encoding="utf-8") as f:
 with open(os.path.join(os.path.dirname(__file__), "..", "README.md"), "r", encoding="utf-8") as f:
     long_description = f.read()
 
+# Compile the type checker and the lexer to C extensions with mypyc when
+# asked to; the pure Python package is installed otherwise
+ext_modules = []
+if os.environ.get("AETHERSCRIPT_USE_MYPYC") == "1":
+    from mypyc.build import mypycify
+    ext_modules = mypycify([
+        "aetherscript/analyzer/type_checker.py",
+        "aetherscript/parser/lexer.py",
+    ])
+
 setup(
     name="aetherscript",
     version="0.1.0",
@@ -23,6 +33,7 @@ setup(
     url="https://github.com/yourusername/aetherscript-vscode",
     packages=find_packages(),
     install_requires=requirements,
+    ext_modules=ext_modules,
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
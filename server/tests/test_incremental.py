@@ -0,0 +1,64 @@
+"""Tests for incremental re-parsing."""
+
+import random
+
+import pytest
+
+from aetherscript.parser.incremental import offset_at, reparse
+from aetherscript.parser.parser import Parser
+
+
+def parse(source):
+    parser = Parser(source)
+    return parser, parser.parse()
+
+
+def assert_same_as_full_parse(old, new, changed_offset):
+    previous, _ = parse(old)
+    parser, program = reparse(previous, new, changed_offset)
+    full_parser, full_program = parse(new)
+
+    assert program.statements == full_program.statements
+    assert [(error.token, error.message) for error in parser.errors] == [
+        (error.token, error.message) for error in full_parser.errors
+    ]
+    assert parser.boundaries == full_parser.boundaries
+
+
+@pytest.mark.parametrize("source, line, character, expected", [
+    ("abc\ndef", 0, 2, 2),
+    ("abc\ndef", 1, 1, 5),
+    ("abc\ndef", 1, 10, 7),
+    ("abc\ndef", 5, 0, 7),
+    ("ab\ncd", 0, 9, 2),
+    # U+00E9 is one UTF-16 code unit, U+1F600 is two
+    ("éx", 0, 1, 1),
+    ("\U0001F600x", 0, 2, 1),
+    ("a\n\U0001F600\U0001F600x", 1, 4, 4),
+])
+def test_offset_at_counts_utf16_code_units(source, line, character, expected):
+    assert offset_at(source, line, character) == expected
+
+
+def test_reparse_after_astral_characters():
+    old = '"' + "\U0001F600" * 8 + '"; a; b; c;'
+    new = old.replace(" a;", " zz;")
+    # The LSP position of the edit, in UTF-16 code units
+    changed_offset = offset_at(new, 0, len(old.encode("utf-16-le")) // 2 - len(" a; b; c;") + 1)
+
+    assert changed_offset == new.index("zz")
+    assert_same_as_full_parse(old, new, changed_offset)
+
+
+def test_reparse_matches_full_parse():
+    pieces = ["x", " ", "1", "+", "*", "==", "<", "(", ")", ";", "\n", "2.5", '"s"', "-", "%", "y", "@"]
+    rng = random.Random(1)
+
+    for _ in range(2000):
+        old = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+        start = rng.randint(0, len(old))
+        end = rng.randint(start, len(old))
+        inserted = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 4)))
+        new = old[:start] + inserted + old[end:]
+
+        assert_same_as_full_parse(old, new, start)
@@ -0,0 +1,29 @@
+"""Tests for the lexer."""
+
+from aetherscript.parser.lexer import Lexer, TokenType
+from aetherscript.parser.parser import Parser
+
+
+def token_types(source):
+    return [token.type for token in Lexer(source).tokenize()]
+
+
+def test_non_ascii_decimal_digits_are_numbers():
+    tokens = Lexer("١٢ + 3;").tokenize()
+
+    assert tokens[0].type == TokenType.INTEGER
+    assert int(tokens[0].value) == 12
+
+
+def test_digits_that_are_not_decimal_are_errors():
+    # "²" is a digit to str.isdigit(), but int() cannot convert it
+    assert token_types("²;") == [TokenType.ERROR, TokenType.SEMICOLON, TokenType.EOF]
+    assert token_types("1²;") == [TokenType.INTEGER, TokenType.ERROR, TokenType.SEMICOLON, TokenType.EOF]
+
+
+def test_non_decimal_digit_does_not_crash_the_parser():
+    parser = Parser("1²; x;")
+    program = parser.parse()
+
+    assert [error.message for error in parser.errors] == ["Expected ';' after expression."]
+    assert len(program.statements) == 1
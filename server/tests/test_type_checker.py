@@ -0,0 +1,64 @@
+"""Tests for the type checker."""
+
+from aetherscript.analyzer.type_checker import TypeChecker
+from aetherscript.parser.ast import (
+    BlockStatement, BooleanLiteral, ExpressionStatement, ForStatement,
+    FunctionDeclaration, Identifier, IfStatement, IntegerLiteral, Parameter,
+    Program, ReturnStatement, VariableDeclaration
+)
+
+
+def check(*statements):
+    return [error.message for error in TypeChecker().check(Program(list(statements)))]
+
+
+def declare(name, line=1):
+    return VariableDeclaration(Identifier(name, line, 5), "Int", IntegerLiteral(1, line, 9), line, 1)
+
+
+def if_true(body, line=1):
+    return IfStatement(BooleanLiteral(True, line, 5), body, None, line, 1)
+
+
+def test_brace_less_if_body_declares_in_block_scope():
+    # { if (true) var x: Int = 1; } { if (true) var x: Int = 1; }
+    assert check(
+        BlockStatement([if_true(declare("x", 1), 1)], 1, 1),
+        BlockStatement([if_true(declare("x", 2), 2)], 2, 1),
+    ) == []
+
+
+def test_brace_less_for_body_declares_in_loop_scope():
+    # for (;;) var i: Int = 1; for (;;) var i: Int = 1;
+    assert check(
+        ForStatement(None, None, None, declare("i", 1), 1, 1),
+        ForStatement(None, None, None, declare("i", 2), 2, 1),
+    ) == []
+
+
+def test_declaration_in_if_inside_block_is_not_visible_after_it():
+    # { if (true) var y: Int = 1; } y;
+    assert check(
+        BlockStatement([if_true(declare("y", 1), 1)], 1, 1),
+        ExpressionStatement(Identifier("y", 2, 1), 2, 1),
+    ) == ["Undefined identifier 'y'"]
+
+
+def test_returning_one_unknown_type_from_another_is_reported():
+    # function f(x: Foo) -> Bar { return x; }
+    assert check(
+        FunctionDeclaration(
+            Identifier("f", 1, 10), [Parameter(Identifier("x", 1, 12), "Foo")], "Bar",
+            [ReturnStatement(Identifier("x", 2, 12), 2, 5)], 1, 1
+        ),
+    ) == ["Cannot return a value of type 'Foo' from a function with return type 'Bar'"]
+
+
+def test_condition_of_unknown_type_is_reported_by_name():
+    # function f(x: Foo) -> Void { if (x) {} }
+    assert check(
+        FunctionDeclaration(
+            Identifier("f", 1, 10), [Parameter(Identifier("x", 1, 12), "Foo")], "Void",
+            [IfStatement(Identifier("x", 2, 9), BlockStatement([], 2, 12), None, 2, 5)], 1, 1
+        ),
+    ) == ["If condition must be a Boolean, got 'Foo'"]